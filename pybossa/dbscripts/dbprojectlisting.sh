@@ -0,0 +1,55 @@
+#!/bin/bash
+DATABASE=your-db-name
+USERNAME=your-db-username
+HOSTNAME=your-db-hostname
+export PGPASSWORD=your-db-password
+# ignore column 'has_presenter' addition if it exist in 'project' table
+column_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT column_name FROM information_schema.columns WHERE table_name='project' and column_name='has_presenter';"`
+if [ -z "$column_name" ]; then
+   echo "'has_presenter' column doesnt exist. adding 'has_presenter' column to 'project' table"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "ALTER TABLE project ADD COLUMN has_presenter BOOLEAN NOT NULL DEFAULT false;"
+   column_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT column_name FROM information_schema.columns WHERE table_name='project' and column_name='has_presenter';"`
+   if [ -z "$column_name" ]; then
+      echo "error adding column 'has_presenter' to table 'project'"
+      exit 1
+   fi
+   echo "populating 'has_presenter' column"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "UPDATE project SET has_presenter=(CAST(info AS JSONB) ? 'task_presenter');"
+fi
+echo "'has_presenter' column exist in 'project' table"
+# ignore column 'n_tasks' addition if it exist in 'project' table
+column_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT column_name FROM information_schema.columns WHERE table_name='project' and column_name='n_tasks';"`
+if [ -z "$column_name" ]; then
+   echo "'n_tasks' column doesnt exist. adding 'n_tasks' column to 'project' table"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "ALTER TABLE project ADD COLUMN n_tasks INTEGER NOT NULL DEFAULT 0;"
+   column_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT column_name FROM information_schema.columns WHERE table_name='project' and column_name='n_tasks';"`
+   if [ -z "$column_name" ]; then
+      echo "error adding column 'n_tasks' to table 'project'"
+      exit 1
+   fi
+   echo "populating 'n_tasks' column"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "UPDATE project SET n_tasks=counts.n_tasks FROM (SELECT project_id, COUNT(*) AS n_tasks FROM task GROUP BY project_id) AS counts WHERE project.id=counts.project_id;"
+fi
+echo "'n_tasks' column exist in 'project' table"
+index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='project' and indexname='project_published_category_idx';"`
+if [ -z "$index_name" ]; then
+   echo "'project_published_category_idx' index doesnt exist. creating it on 'project' table"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "CREATE INDEX CONCURRENTLY project_published_category_idx ON project (category_id, name) WHERE hidden=0 AND has_presenter AND n_tasks > 0;"
+   index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='project' and indexname='project_published_category_idx';"`
+   if [ -z "$index_name" ]; then
+      echo "error creating index 'project_published_category_idx' on table 'project'"
+      exit 1
+   fi
+fi
+echo "'project_published_category_idx' index exist in 'project' table"
+index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='project' and indexname='project_draft_idx';"`
+if [ -z "$index_name" ]; then
+   echo "'project_draft_idx' index doesnt exist. creating it on 'project' table"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "CREATE INDEX CONCURRENTLY project_draft_idx ON project (id) WHERE hidden=0 AND NOT has_presenter AND n_tasks = 0;"
+   index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='project' and indexname='project_draft_idx';"`
+   if [ -z "$index_name" ]; then
+      echo "error creating index 'project_draft_idx' on table 'project'"
+      exit 1
+   fi
+fi
+echo "'project_draft_idx' index exist in 'project' table"
@@ -0,0 +1,31 @@
+#!/bin/bash
+DATABASE=your-db-name
+USERNAME=your-db-username
+HOSTNAME=your-db-hostname
+export PGPASSWORD=your-db-password
+# ignore column 'rank_score' addition if it exist in 'project' table
+column_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT column_name FROM information_schema.columns WHERE table_name='project' and column_name='rank_score';"`
+if [ -z "$column_name" ]; then
+   echo "'rank_score' column doesnt exist. adding 'rank_score' column to 'project' table"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "ALTER TABLE project ADD COLUMN rank_score INTEGER NOT NULL DEFAULT 0;"
+   column_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT column_name FROM information_schema.columns WHERE table_name='project' and column_name='rank_score';"`
+   if [ -z "$column_name" ]; then
+      echo "error adding column 'rank_score' to table 'project'"
+      exit 1
+   fi
+fi
+echo "'rank_score' column exist in 'project' table"
+# scores are computed by the update_project_rank_scores background job
+index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='project' and indexname='project_published_rank_idx';"`
+if [ -z "$index_name" ]; then
+   echo "'project_published_rank_idx' index doesnt exist. creating it on 'project' table"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "CREATE INDEX CONCURRENTLY project_published_rank_idx ON project (category_id, rank_score DESC, name) WHERE hidden=0 AND has_presenter AND n_tasks > 0;"
+   index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='project' and indexname='project_published_rank_idx';"`
+   if [ -z "$index_name" ]; then
+      echo "error creating index 'project_published_rank_idx' on table 'project'"
+      exit 1
+   fi
+fi
+echo "'project_published_rank_idx' index exist in 'project' table"
+# the rank index replaces the published projects index ordered by name
+psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "DROP INDEX CONCURRENTLY IF EXISTS project_published_category_idx;"
@@ -0,0 +1,32 @@
+#!/bin/bash
+DATABASE=your-db-name
+USERNAME=your-db-username
+HOSTNAME=your-db-hostname
+export PGPASSWORD=your-db-password
+# index used by the incremental refresh of the rollups
+index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='task_run' and indexname='task_run_finish_time_idx';"`
+if [ -z "$index_name" ]; then
+   echo "'task_run_finish_time_idx' index doesnt exist. creating it on 'task_run' table"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "CREATE INDEX CONCURRENTLY task_run_finish_time_idx ON task_run (finish_time);"
+   index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='task_run' and indexname='task_run_finish_time_idx';"`
+   if [ -z "$index_name" ]; then
+      echo "error creating index 'task_run_finish_time_idx' on table 'task_run'"
+      exit 1
+   fi
+fi
+echo "'task_run_finish_time_idx' index exist in 'task_run' table"
+for rollup in "project_stats_hour:hour:TIMESTAMP" "project_stats_day:day:DATE"; do
+   IFS=: read table bucket type <<< "$rollup"
+   table_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT table_name FROM information_schema.tables WHERE table_name='$table';"`
+   if [ -z "$table_name" ]; then
+      echo "'$table' table doesnt exist. creating it"
+      psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "CREATE TABLE $table (project_id INTEGER NOT NULL REFERENCES project(id) ON DELETE CASCADE, $bucket $type NOT NULL, n_answers INTEGER NOT NULL DEFAULT 0, n_anon_answers INTEGER NOT NULL DEFAULT 0, n_auth_answers INTEGER NOT NULL DEFAULT 0, n_contributors INTEGER NOT NULL DEFAULT 0, n_completed_tasks INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (project_id, $bucket));"
+      table_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT table_name FROM information_schema.tables WHERE table_name='$table';"`
+      if [ -z "$table_name" ]; then
+         echo "error creating table '$table'"
+         exit 1
+      fi
+   fi
+   echo "'$table' table exist"
+done
+# existing task runs are aggregated by the refresh_stats_rollups background job
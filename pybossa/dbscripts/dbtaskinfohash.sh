@@ -0,0 +1,33 @@
+#!/bin/bash
+DATABASE=your-db-name
+USERNAME=your-db-username
+HOSTNAME=your-db-hostname
+export PGPASSWORD=your-db-password
+# ignore column 'info_hash' addition if it exist in 'task' table
+column_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT column_name FROM information_schema.columns WHERE table_name='task' and column_name='info_hash';"`
+if [ -z "$column_name" ]; then
+   echo "'info_hash' column doesnt exist. adding 'info_hash' column to 'task' table"
+   # add info_hash column
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "ALTER TABLE task ADD COLUMN info_hash TEXT;"
+   # check column created successfully
+   column_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT column_name FROM information_schema.columns WHERE table_name='task' and column_name='info_hash';"`
+   if [ -z "$column_name" ]; then
+      echo "error adding column 'info_hash' to table 'task'"
+      exit 1
+   fi
+fi
+echo "'info_hash' column exist in 'task' table"
+# the index used to be unique, which made the API reject tasks repeating an info
+psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "DROP INDEX CONCURRENTLY IF EXISTS task_project_id_info_hash_key;"
+# existing rows are populated by the backfill_task_info_hash background job
+index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='task' and indexname='task_project_id_info_hash_idx';"`
+if [ -z "$index_name" ]; then
+   echo "'task_project_id_info_hash_idx' index doesnt exist. creating it on 'task' table"
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "CREATE INDEX CONCURRENTLY task_project_id_info_hash_idx ON task (project_id, info_hash);"
+   index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='task' and indexname='task_project_id_info_hash_idx';"`
+   if [ -z "$index_name" ]; then
+      echo "error creating index 'task_project_id_info_hash_idx' on table 'task'"
+      exit 1
+   fi
+fi
+echo "'task_project_id_info_hash_idx' index exist in 'task' table"
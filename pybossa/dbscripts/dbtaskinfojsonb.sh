@@ -0,0 +1,31 @@
+#!/bin/bash
+DATABASE=your-db-name
+USERNAME=your-db-username
+HOSTNAME=your-db-hostname
+export PGPASSWORD=your-db-password
+# convert 'info' of 'task' and 'task_run' tables from text to jsonb and index it
+# each ALTER TABLE rewrites its table under an exclusive lock: run it off-peak
+for table in task task_run; do
+   data_type=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT data_type FROM information_schema.columns WHERE table_name='$table' and column_name='info';"`
+   if [ "$data_type" != "jsonb" ]; then
+      echo "'info' column of '$table' table is $data_type. converting it to jsonb"
+      psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "ALTER TABLE $table ALTER COLUMN info TYPE JSONB USING info::jsonb;"
+      data_type=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT data_type FROM information_schema.columns WHERE table_name='$table' and column_name='info';"`
+      if [ "$data_type" != "jsonb" ]; then
+         echo "error converting column 'info' of table '$table' to jsonb"
+         exit 1
+      fi
+   fi
+   echo "'info' column of '$table' table is jsonb"
+   index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='$table' and indexname='${table}_info_idx';"`
+   if [ -z "$index_name" ]; then
+      echo "'${table}_info_idx' index doesnt exist. creating it on '$table' table"
+      psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "CREATE INDEX CONCURRENTLY ${table}_info_idx ON $table USING GIN (info jsonb_path_ops);"
+      index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='$table' and indexname='${table}_info_idx';"`
+      if [ -z "$index_name" ]; then
+         echo "error creating index '${table}_info_idx' on table '$table'"
+         exit 1
+      fi
+   fi
+   echo "'${table}_info_idx' index exist in '$table' table"
+done
@@ -0,0 +1,34 @@
+#!/bin/bash
+DATABASE=your-db-name
+USERNAME=your-db-username
+HOSTNAME=your-db-hostname
+export PGPASSWORD=your-db-password
+# ignore 'created' and 'finish_time' conversion if they are already timestamps in 'task_run' table
+data_type=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT data_type FROM information_schema.columns WHERE table_name='task_run' and column_name='finish_time';"`
+if [ "$data_type" != "timestamp with time zone" ]; then
+   echo "'finish_time' column is not a timestamp. converting 'created' and 'finish_time' columns of 'task_run' table"
+   # dashboard materialized views depend on task_run.finish_time; dashboard jobs create them again
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "DROP MATERIALIZED VIEW IF EXISTS dashboard_week_users, dashboard_week_anon, dashboard_week_new_task_run, dashboard_week_returning_users;"
+   # stored values are naive UTC ISO strings
+   psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "ALTER TABLE task_run ALTER COLUMN created TYPE TIMESTAMP WITH TIME ZONE USING NULLIF(created, '')::TIMESTAMP AT TIME ZONE 'UTC', ALTER COLUMN finish_time TYPE TIMESTAMP WITH TIME ZONE USING NULLIF(finish_time, '')::TIMESTAMP AT TIME ZONE 'UTC';"
+   # check columns converted successfully
+   data_type=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT data_type FROM information_schema.columns WHERE table_name='task_run' and column_name='finish_time';"`
+   if [ "$data_type" != "timestamp with time zone" ]; then
+      echo "error converting columns 'created' and 'finish_time' of table 'task_run'"
+      exit 1
+   fi
+fi
+echo "'created' and 'finish_time' columns are timestamps in 'task_run' table"
+for index in project_id user_id; do
+   index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='task_run' and indexname='task_run_${index}_finish_time_idx';"`
+   if [ -z "$index_name" ]; then
+      echo "'task_run_${index}_finish_time_idx' index doesnt exist. creating it on 'task_run' table"
+      psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -c "CREATE INDEX CONCURRENTLY task_run_${index}_finish_time_idx ON task_run (${index}, finish_time);"
+      index_name=`psql --host $HOSTNAME --user $USERNAME --dbname $DATABASE -Atc "SELECT indexname FROM pg_indexes WHERE tablename='task_run' and indexname='task_run_${index}_finish_time_idx';"`
+      if [ -z "$index_name" ]; then
+         echo "error creating index 'task_run_${index}_finish_time_idx' on table 'task_run'"
+         exit 1
+      fi
+   fi
+   echo "'task_run_${index}_finish_time_idx' index exist in 'task_run' table"
+done
@@ -37,9 +37,11 @@ from flask.ext.login import current_user
 from werkzeug.exceptions import NotFound
 from pybossa.util import jsonpify, crossdomain, get_user_id_or_ip
 import pybossa.model as model
-from pybossa.core import csrf, ratelimits, sentinel
+from pybossa.core import csrf, ratelimits
 from pybossa.ratelimit import ratelimit
 from pybossa.cache.projects import n_tasks
+from pybossa.contributions import n_contributions
+from pybossa import task_requests
 import pybossa.sched as sched
 from pybossa.error import ErrorStatus
 from global_stats import GlobalStatsAPI
@@ -51,7 +53,7 @@ from category import CategoryAPI
 from vmcp import VmcpAPI
 from user import UserAPI
 from token import TokenAPI
-from pybossa.core import project_repo, task_repo
+from pybossa.core import project_repo
 from completed_task import CompletedTaskAPI
 from completed_task_run import CompletedTaskRunAPI
 from datetime import datetime
@@ -115,7 +117,7 @@ def new_task(project_id):
         task = _retrieve_new_task(project_id)
         # If there is a task for the user, return it
         if task is not None:
-            mark_task_as_requested_by_user(task, sentinel.master)
+            mark_task_as_requested_by_user(task)
             response = make_response(json.dumps(task.dictize()))
             response.mimetype = "application/json"
             return response
@@ -141,11 +143,10 @@ def _retrieve_new_task(project_id):
     task = sched.new_task(project_id, project.info.get('sched'), user_id, user_ip, offset)
     return task
 
-def mark_task_as_requested_by_user(task, redis_conn):
-    usr = get_user_id_or_ip()['user_id'] or get_user_id_or_ip()['user_ip']
-    key = 'pybossa:task_requested:user:%s:task:%s' % (usr, task.id)
-    timeout = 60 * 60
-    redis_conn.setex(key, timeout, True)
+def mark_task_as_requested_by_user(task):
+    user_id_ip = get_user_id_or_ip()
+    usr = user_id_ip['user_id'] or user_id_ip['user_ip']
+    task_requests.mark_requested(usr, task.id)
 
 
 @jsonpify
@@ -167,16 +168,11 @@ def set_cache_presented_time(task_id, force=False):
     """
     # usr can only be a registered user with a user_id
     usr = get_user_id_or_ip()['user_id'] or None
-    redis_conn = sentinel.master
-
-    # Timeout set for 60 minutes to coincide with inactivity timeout
-    timeout = 60 * 60
 
     # Only set cache if usr is not None so that the cache cannot be set
     # by calling the API directly
-    if redis_conn is not None and usr is not None:
+    if usr is not None:
         presented_time = datetime.utcnow().isoformat()
-        presented_time_key = 'pybossa:user:{0}:task_id:{1}:presented_time_key'.format(usr, task_id)
 
         # Set presented_time value if presented_time_key does not exist yet.
         # The presented time cannot be reset until it times out. 
@@ -186,13 +182,10 @@ def set_cache_presented_time(task_id, force=False):
         # This is an appropriate solution since we do not have complete information
         # regarding whether or not a user actually looked at a task before a browser reload,
         # logout or timeout.
-        if redis_conn.get(presented_time_key) is None:
-            redis_conn.setex(presented_time_key, timeout, presented_time)
         # Only overwrite an existing presented_time_value if force = True.
         # This should ONLY be used if there is no way for a user to take advantage
         # of this feature to manuipulate the presented time.
-        elif force == True:
-            redis_conn.setex(presented_time_key, timeout, presented_time)
+        task_requests.mark_presented(usr, task_id, presented_time, force=force)
 
 
 @jsonpify
@@ -220,13 +213,11 @@ def user_progress(project_id=None, short_name=None):
             project = project_repo.get(project_id)
 
         if project:
-            # For now, keep this version, but wait until redis cache is used here for task_runs too
-            query_attrs = dict(project_id=project.id)
             if current_user.is_anonymous():
-                query_attrs['user_ip'] = request.remote_addr or '127.0.0.1'
+                user = dict(user_ip=request.remote_addr or '127.0.0.1')
             else:
-                query_attrs['user_id'] = current_user.id
-            taskrun_count = task_repo.count_task_runs_with(**query_attrs)
+                user = dict(user_id=current_user.id)
+            taskrun_count = n_contributions(project.id, **user)
             tmp = dict(done=taskrun_count, total=n_tasks(project.id))
             return Response(json.dumps(tmp), mimetype="application/json")
         else:
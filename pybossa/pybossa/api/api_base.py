@@ -26,16 +26,20 @@ This package adds GET, POST, PUT and DELETE methods for any class:
     * etc.
 
 """
+import hashlib
 import json
-from flask import request, abort, Response
+import os
+from flask import request, abort, Response, stream_with_context, current_app
+from flask.ext.login import current_user
 from flask.views import MethodView
-from werkzeug.exceptions import NotFound, Unauthorized, Forbidden
+from werkzeug.exceptions import NotFound
 from pybossa.util import jsonpify, crossdomain
-from pybossa.core import ratelimits
-from pybossa.auth import ensure_authorized_to
+from pybossa.core import ratelimits, timeouts, sentinel
+from pybossa.auth import ensure_authorized_to, filter_authorized_to
 from pybossa.hateoas import Hateoas
 from pybossa.ratelimit import ratelimit
 from pybossa.error import ErrorStatus
+from pybossa.model import JSONBType
 from pybossa.core import project_repo, user_repo, task_repo
 
 repos = {'Task'   : {'repo': task_repo, 'filter': 'filter_tasks_by',
@@ -64,6 +68,10 @@ class APIBase(MethodView):
 
     hateoas = Hateoas()
 
+    # Columns always loaded when a sparse fieldset is requested, besides the
+    # primary and foreign keys, as authorization or privacy checks need them
+    required_fields = ()
+
     def valid_args(self):
         """Check if the domain object args are valid."""
         for k in request.args.keys():
@@ -91,38 +99,179 @@ class APIBase(MethodView):
         """
         try:
             ensure_authorized_to('read', self.__class__)
-            query = self._db_query(oid)
-            json_response = self._create_json_response(query, oid)
-            return Response(json_response, mimetype='application/json')
+            etag = self._version_etag(oid)
+            if etag is not None and etag in request.if_none_match:
+                return self._conditional(Response(status=304), etag)
+            cache_key = self._anonymous_cache_key()
+            body = sentinel.slave.get(cache_key) if cache_key else None
+            if body is None:
+                query = self._db_query(oid)
+                body = self._create_json_response(query, oid)
+                if cache_key:
+                    body = ''.join(body)
+                    sentinel.master.setex(cache_key,
+                                          timeouts['API_ANON_TIMEOUT'], body)
+            response = Response(body, mimetype='application/json')
+            if cache_key:
+                response.cache_control.public = True
+                response.cache_control.max_age = timeouts['API_ANON_TIMEOUT']
+            if oid:
+                response = self._conditional(response,
+                                             etag or self._etag(body))
+            return response
         except Exception as e:
             return error.format_exception(
                 e,
                 target=self.__class__.__name__.lower(),
                 action='GET')
 
+    def _version(self, oid):
+        """Method to be overriden by inheriting classes which can tell the
+        version of an object without loading it (e.g. its updated timestamp).
+        """
+        return None
+
+    def _etag(self, version):
+        """Return the ETag of a version of the requested resource, for the
+        current user and query string."""
+        user = 'anonymous' if current_user.is_anonymous() else current_user.id
+        parts = [request.path, request.query_string, user, version]
+        key = ':'.join(part.encode('utf-8') if isinstance(part, unicode)
+                       else str(part) for part in parts)
+        return hashlib.md5(key).hexdigest()
+
+    def _version_etag(self, oid):
+        if not oid or request.args.get('callback'):
+            return None
+        version = self._version(oid)
+        if version is None:
+            return None
+        return self._etag(version)
+
+    def _conditional(self, response, etag):
+        if request.args.get('callback'):
+            return response
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+    def _anonymous_cache_key(self):
+        """Return the key of the shared response cache for anonymous GETs,
+        or None if the response is not to be cached.
+
+        The key includes the generation of the resource, so the responses
+        cached before a POST, PUT or DELETE through the API are not served
+        afterwards."""
+        if (not timeouts.get('API_ANON_TIMEOUT') or
+                not current_user.is_anonymous() or
+                os.environ.get('PYBOSSA_REDIS_CACHE_DISABLED') is not None):
+            return None
+        generation = sentinel.slave.get(self._anonymous_generation_key()) or 0
+        return 'pybossa:api:anonymous:%s:%s:%s' % (
+            self.__class__.__name__.lower(), generation,
+            hashlib.md5(request.full_path).hexdigest())
+
+    def _anonymous_generation_key(self):
+        return 'pybossa:api:anonymous:%s:generation' % (
+            self.__class__.__name__.lower())
+
+    def _clear_anonymous_cache(self):
+        """Stop serving the anonymous responses cached for this resource.
+        The old entries are left to expire."""
+        if timeouts.get('API_ANON_TIMEOUT'):
+            sentinel.master.incr(self._anonymous_generation_key())
+
     def _create_json_response(self, query_result, oid):
         if len (query_result) == 1 and query_result[0] is None:
             raise abort(404)
-        items = []
-        for item in query_result:
-            try:
-                items.append(self._create_dict_from_model(item))
-                ensure_authorized_to('read', item)
-            except (Forbidden, Unauthorized):
-                # Remove last added item, as it is 401 or 403
-                items.pop()
-            except Exception as ex: # pragma: no cover
-                raise
         if oid:
             ensure_authorized_to('read', query_result[0])
-            items = items[0]
-        return json.dumps(items)
+            return self._encode(self._create_dict_from_model(query_result[0]))
+        # Unauthorized items (401 or 403) are left out of the list
+        items = filter_authorized_to('read', query_result)
+        if not items:
+            return '[]'
+        # The first item is encoded before the response starts, so an error
+        # from encoding items still gets an error response in most cases
+        first = self._encode(self._create_dict_from_model(items[0]))
+        return stream_with_context(self._encode_list(first, items[1:]))
+
+    def _encode_list(self, first, items):
+        """Yield the JSON list of the encoded first item and items, one
+        encoded item at a time.
+
+        Once the response has started it cannot become an error response, so
+        an error is logged and the body is cut short, which leaves it invalid
+        JSON rather than a list with items missing."""
+        yield '[' + first
+        try:
+            for item in items:
+                yield ', ' + self._encode(self._create_dict_from_model(item))
+        except Exception:
+            current_app.logger.exception('API list response cut short')
+            raise
+        yield ']'
+
+    def _encode(self, obj):
+        """Return obj as JSON, passing its info through verbatim if it is
+        still the JSON text stored in the database."""
+        raw_info = getattr(obj.get('info'), 'raw_json', None)
+        if raw_info is None:
+            return json.dumps(obj)
+        rest = dict(obj)
+        del rest['info']
+        encoded = json.dumps(rest)[:-1]
+        if rest:
+            encoded += ', '
+        return encoded + '"info": ' + raw_info + '}'
 
     def _create_dict_from_model(self, model):
-        return self._select_attributes(self._add_hateoas_links(model))
+        obj = self._select_attributes(self._add_hateoas_links(model))
+        fields = self._fields()
+        if fields is None:
+            return obj
+        return dict((k, v) for k, v in obj.items()
+                    if k in fields or k in ('links', 'link'))
+
+    def _fields(self):
+        """Return the columns requested with the fields argument, or None
+        if all of them are to be returned."""
+        if not request.args.get('fields'):
+            return None
+        fields = [field.strip() for field in request.args['fields'].split(',')
+                  if field.strip()]
+        # Raise an error if any of the fields is not a column
+        columns = [c.name for c in self.__class__.__table__.c]
+        for field in fields:
+            if field not in columns and field != 'links':
+                raise AttributeError(field)
+        return fields
+
+    def _query_fields(self):
+        """Return the columns to load for the requested fields, or None if
+        all of them are to be loaded."""
+        fields = self._fields()
+        if fields is None:
+            return None
+        table = self.__class__.__table__
+        keys = [c.name for c in table.primary_key.columns]
+        keys += [fk.parent.name for fk in table.foreign_keys]
+        query_fields = [field for field in fields if field != 'links']
+        for field in keys + list(self.required_fields):
+            if field not in query_fields:
+                query_fields.append(field)
+        return query_fields
 
     def _add_hateoas_links(self, item):
-        obj = item.dictize()
+        query_fields = self._query_fields()
+        if query_fields is None:
+            obj = item.dictize()
+        else:
+            obj = dict((field, getattr(item, field)) for field in query_fields)
+        if request.args.get('links', '').lower() == 'false':
+            return obj
+        fields = self._fields()
+        if fields is not None and 'links' not in fields:
+            return obj
         links, link = self.hateoas.create_links(item)
         if links:
             obj['links'] = links
@@ -145,16 +294,27 @@ class APIBase(MethodView):
     def _filter_query(self, repo_info, limit, offset):
         filters = {}
         for k in request.args.keys():
-            if k not in ['limit', 'offset', 'api_key']:
+            if k not in ['limit', 'offset', 'api_key', 'links', 'fields']:
+                if k.startswith('info.') and self._info_filterable():
+                    filters[k] = request.args[k]
+                    continue
                 # Raise an error if the k arg is not a column
                 getattr(self.__class__, k)
                 filters[k] = request.args[k]
         repo = repo_info['repo']
         query_func = repo_info['filter']
         filters = self._custom_filter(filters)
-        results = getattr(repo, query_func)(limit=limit, offset=offset, **filters)
+        results = getattr(repo, query_func)(limit=limit, offset=offset,
+                                            fields=self._query_fields(),
+                                            **filters)
         return results
 
+    def _info_filterable(self):
+        """Return whether the info column supports info.<key>=value filters,
+        i.e. whether it is stored as jsonb."""
+        info = self.__class__.__table__.c.get('info')
+        return info is not None and isinstance(info.type, JSONBType)
+
     def _set_limit_and_offset(self):
         try:
             limit = min(100, int(request.args.get('limit')))
@@ -186,6 +346,7 @@ class APIBase(MethodView):
             save_func = repos[self.__class__.__name__]['save']
             getattr(repo, save_func)(inst)
             self._log_changes(None, inst)
+            self._clear_anonymous_cache()
             return json.dumps(inst.dictize())
         except Exception as e:
             return error.format_exception(
@@ -230,6 +391,7 @@ class APIBase(MethodView):
         try:
             self.valid_args()
             self._delete_instance(oid)
+            self._clear_anonymous_cache()
             return '', 204
         except Exception as e:
             return error.format_exception(
@@ -266,6 +428,7 @@ class APIBase(MethodView):
         try:
             self.valid_args()
             inst = self._update_instance(oid)
+            self._clear_anonymous_cache()
             return Response(json.dumps(inst.dictize()), 200,
                             mimetype='application/json')
         except Exception as e:
@@ -24,6 +24,7 @@ This package adds GET, POST, PUT and DELETE methods for:
 """
 from api_base import APIBase
 from pybossa.model.category import Category
+from pybossa.core import project_repo
 
 
 class CategoryAPI(APIBase):
@@ -31,3 +32,9 @@ class CategoryAPI(APIBase):
     """Class API for domain object Category."""
 
     __class__ = Category
+
+    def _version(self, oid):
+        version = project_repo.get_category_version(oid)
+        if version is None:
+            return None
+        return ':'.join(unicode(value) for value in version)
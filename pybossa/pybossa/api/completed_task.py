@@ -68,7 +68,7 @@ class CompletedTaskAPI(APIBase):
             filters = {}
             filters['state'] = 'completed'
             for k in request.args.keys():
-                if k not in ['limit', 'offset', 'api_key']:
+                if k not in ['limit', 'offset', 'api_key', 'links', 'fields']:
                     # 'exported' column belongs to Task class
                     # ignore it for attr check in TaskRun class
                     # but add it to filter so that its checked
@@ -67,7 +67,7 @@ class CompletedTaskRunAPI(APIBase):
             # set filter from args
             filters = {}
             for k in request.args.keys():
-                if k not in ['limit', 'offset', 'api_key']:
+                if k not in ['limit', 'offset', 'api_key', 'links', 'fields']:
                     # 'exported' column belongs to Task class
                     # ignore it for attr check in TaskRun class
                     # but add it to filter so that its checked
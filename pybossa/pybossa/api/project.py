@@ -28,7 +28,7 @@ from api_base import APIBase
 from pybossa.model.project import Project
 from pybossa.cache.categories import get_all as get_categories
 from pybossa.util import is_reserved_name
-from pybossa.core import auditlog_repo
+from pybossa.core import auditlog_repo, project_repo
 from pybossa.auditlogger import AuditLogger
 
 auditlogger = AuditLogger(auditlog_repo, caller='api')
@@ -44,7 +44,9 @@ class ProjectAPI(APIBase):
     """
 
     __class__ = Project
-    reserved_keys = set(['id', 'created', 'updated', 'completed', 'contacted'])
+    reserved_keys = set(['id', 'created', 'updated', 'completed', 'contacted',
+                         'has_presenter', 'n_tasks', 'rank_score'])
+    required_fields = ('hidden',)
 
     def _create_instance_from_request(self, data):
         inst = super(ProjectAPI, self)._create_instance_from_request(data)
@@ -52,6 +54,14 @@ class ProjectAPI(APIBase):
         inst.category_id = default_category.id
         return inst
 
+    def _version(self, oid):
+        version = project_repo.get_version(oid)
+        if version is None:
+            return None
+        # rank_score and n_tasks are updated by a background job and by the
+        # task listeners without touching updated
+        return ':'.join(str(value) for value in version)
+
     def _update_object(self, obj):
         if not current_user.is_anonymous():
             obj.owner_id = current_user.id
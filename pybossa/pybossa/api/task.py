@@ -24,6 +24,7 @@ This package adds GET, POST, PUT and DELETE methods for:
 """
 from werkzeug.exceptions import BadRequest
 from pybossa.model.task import Task
+from pybossa.core import task_repo
 from api_base import APIBase
 
 
@@ -32,7 +33,13 @@ class TaskAPI(APIBase):
     """Class for domain object Task."""
 
     __class__ = Task
-    reserved_keys = set(['id', 'created', 'state'])
+    reserved_keys = set(['id', 'created', 'state', 'info_hash'])
+
+    def _version(self, oid):
+        version = task_repo.get_version(oid)
+        if version is None:
+            return None
+        return ':'.join(str(value) for value in version)
 
     def _forbidden_attributes(self, data):
         for key in data.keys():
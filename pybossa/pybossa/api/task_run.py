@@ -29,7 +29,8 @@ from werkzeug.exceptions import Forbidden, BadRequest
 
 from api_base import APIBase
 from pybossa.util import get_user_id_or_ip
-from pybossa.core import task_repo, sentinel
+from pybossa.core import task_repo
+from pybossa import task_requests
 from pybossa.uploader.s3_uploader import s3_upload_from_string
 from pybossa.gig_utils import json_traverse
 from pybossa.uploader.s3_uploader import s3_upload_file_storage
@@ -64,12 +65,13 @@ class TaskRunAPI(APIBase):
             raise Forbidden('Invalid task_id')
         if task.project_id != taskrun.project_id:
             raise Forbidden('Invalid project_id')
-        if _check_task_requested_by_user(taskrun, sentinel.master) is False:
+        requested, presented_time = _consume_task_request(taskrun)
+        if requested is False:
             raise Forbidden('You must request a task first!')
 
         # validate and modify taskrun attributes
         self._add_user_info(taskrun)
-        self._add_timestamps(taskrun, task, sentinel.master)
+        self._add_timestamps(taskrun, presented_time)
 
     def _forbidden_attributes(self, data):
         for key in data.keys():
@@ -82,20 +84,11 @@ class TaskRunAPI(APIBase):
         else:
             taskrun.user_id = current_user.id
 
-    def _add_timestamps(self, taskrun, task, redis_conn):
-        finish_time = datetime.now().isoformat()
-        # /cachePresentedTime API only caches when there is a user_id
-        usr = taskrun.user_id or None
-        if redis_conn is not None and usr is not None:
-            if task.id:
-                presented_time_key = 'pybossa:user:{0}:task_id:{1}:presented_time_key' \
-                        .format(usr, task.id)
-                presented_time = redis_conn.get(presented_time_key)
-                created = self._validate_datetime(presented_time)
-            else:
-                created = datetime.strptime(self.DEFAULT_DATETIME, self.DATETIME_FORMAT)
-        else:
-            created = datetime.strptime(self.DEFAULT_DATETIME, self.DATETIME_FORMAT)
+    def _add_timestamps(self, taskrun, presented_time):
+        finish_time = datetime.utcnow().isoformat()
+        # /cachePresentedTime API only caches when there is a user_id, so
+        # anonymous task runs get the default created timestamp
+        created = self._validate_datetime(presented_time)
 
         # sanity check
         if created < finish_time:
@@ -107,10 +100,6 @@ class TaskRunAPI(APIBase):
             taskrun.created = created.isoformat()
             taskrun.finish_time = finish_time
 
-        # delete cached time
-        if redis_conn.get(presented_time_key):
-            redis_conn.delete(presented_time_key)
-
     def _validate_datetime(self, timestamp):
         try:
             timestamp = datetime.strptime(timestamp, self.DATETIME_FORMAT)
@@ -120,14 +109,14 @@ class TaskRunAPI(APIBase):
         return timestamp.isoformat()
 
 
-def _check_task_requested_by_user(taskrun, redis_conn):
+def _consume_task_request(taskrun):
+    """Return (requested, presented_time) for the task of taskrun, consuming
+    the request of authenticated users and the presented time at once."""
     user_id_ip = get_user_id_or_ip()
     usr = user_id_ip['user_id'] or user_id_ip['user_ip']
-    key = 'pybossa:task_requested:user:%s:task:%s' % (usr, taskrun.task_id)
-    task_requested = bool(redis_conn.get(key))
-    if user_id_ip['user_id'] is not None:
-        redis_conn.delete(key)
-    return task_requested
+    return task_requests.consume(
+        usr, taskrun.task_id,
+        consume_request=user_id_ip['user_id'] is not None)
 
 def _upload_files_from_json(task_run_info, upload_path):
     def func(obj, key, value):
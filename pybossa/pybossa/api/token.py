@@ -30,6 +30,7 @@ from pybossa.util import jsonpify
 from pybossa.ratelimit import ratelimit
 from api_base import APIBase, error
 from pybossa.auth import ensure_authorized_to
+from pybossa.core import user_repo
 
 class TokenAPI(APIBase):
 
@@ -67,16 +68,18 @@ class TokenAPI(APIBase):
 
 
     def _get_all_tokens(self):
+        # current_user only has its identity if it signed in with an api key
+        info = user_repo.get(current_user.id).info
         tokens = {}
         for provider in self.oauth_providers:
-            token = self._create_token_for('%s_token' % provider)
+            token = self._create_token_for('%s_token' % provider, info)
             if token:
                 tokens['%s_token' % provider] = token
         return tokens
 
 
-    def _create_token_for(self, provider):
-        token_value = dict(current_user.info).get(provider)
+    def _create_token_for(self, provider, info):
+        token_value = dict(info).get(provider)
         if token_value:
             token = dict(oauth_token=token_value['oauth_token'])
             if token_value.get('oauth_token_secret'):
@@ -49,6 +49,8 @@ class UserAPI(APIBase):
     # has privacy_mode disabled
     allowed_attributes = ('name', 'locale', 'fullname', 'created')
 
+    required_fields = ('privacy_mode',)
+
 
     def _select_attributes(self, user_data):
         privacy = self._is_user_private(user_data)
@@ -19,6 +19,7 @@
 import inspect
 from flask import abort
 from flask.ext.login import current_user
+from werkzeug.exceptions import Forbidden, Unauthorized
 from pybossa.core import task_repo, project_repo
 
 import project
@@ -48,6 +49,7 @@ _auth_classes = {'project': project.ProjectAuth,
                  'taskrun': taskrun.TaskRunAuth,
                  'token': token.TokenAuth,
                  'user': user.UserAuth}
+_authorizers = {}
 
 
 def is_authorized(user, action, resource, **kwargs):
@@ -71,10 +73,25 @@ def ensure_authorized_to(action, resource, **kwargs):
     return authorized
 
 
+def filter_authorized_to(action, resources):
+    """Return the resources the current user is authorized to act on."""
+    authorized = []
+    for resource in resources:
+        try:
+            if is_authorized(current_user, action, resource) is not False:
+                authorized.append(resource)
+        except (Forbidden, Unauthorized):
+            pass
+    return authorized
+
+
 def _authorizer_for(resource_name):
-    kwargs = {}
-    if resource_name in ['taskrun']:
-        kwargs = {'task_repo': task_repo, 'project_repo': project_repo}
-    if resource_name in ['auditlog', 'blogpost', 'task']:
-        kwargs = {'project_repo': project_repo}
-    return _auth_classes[resource_name](**kwargs)
+    # Authorizers keep no state, so one instance per resource is reused
+    if resource_name not in _authorizers:
+        kwargs = {}
+        if resource_name in ['taskrun']:
+            kwargs = {'task_repo': task_repo, 'project_repo': project_repo}
+        if resource_name in ['auditlog', 'blogpost', 'task']:
+            kwargs = {'project_repo': project_repo}
+        _authorizers[resource_name] = _auth_classes[resource_name](**kwargs)
+    return _authorizers[resource_name]
@@ -94,11 +94,12 @@ def cache(key_prefix, timeout=300):
     return decorator
 
 
-def memoize(timeout=300):
+def memoize(timeout=300, miss_timeout=None):
     """
     Decorator for caching functions using its arguments as part of the key.
 
-    Returns the cached value, or the function if the cache is disabled
+    Returns the cached value, or the function if the cache is disabled. A
+    None result is cached for miss_timeout seconds instead, if given.
 
     """
     if timeout is None:
@@ -113,11 +114,11 @@ def memoize(timeout=300):
                 output = sentinel.slave.get(key)
                 if output:
                     return pickle.loads(output)
-                output = f(*args, **kwargs)
-                sentinel.master.setex(key, timeout, pickle.dumps(output))
-                return output
             output = f(*args, **kwargs)
-            sentinel.master.setex(key, timeout, pickle.dumps(output))
+            if output is None and miss_timeout is not None:
+                sentinel.master.setex(key, miss_timeout, pickle.dumps(output))
+            else:
+                sentinel.master.setex(key, timeout, pickle.dumps(output))
             return output
         return wrapper
     return decorator
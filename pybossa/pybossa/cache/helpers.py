@@ -20,7 +20,8 @@
 from sqlalchemy.sql import text
 from pybossa.core import db
 from pybossa.cache import memoize, ONE_HOUR
-from pybossa.cache.projects import overall_progress
+from pybossa.cache.projects import overall_progress, n_tasks
+from pybossa.contributions import n_contributions
 
 
 session = db.slave_session
@@ -68,8 +69,16 @@ def check_contributing_state(project, user_id=None, user_ip=None):
     states = ('completed', 'draft', 'can_contribute', 'cannot_contribute')
     if overall_progress(project_id) >= 100:
         return states[0]
-    if _has_no_presenter(project) or _has_no_tasks(project_id):
+    if _has_no_presenter(project) or n_tasks(project_id) == 0:
         return states[1]
+    # The counters settle the common cases without SQL: the project has tasks
+    # left to complete, so a user who has answered none can take one, and a
+    # user who has answered every task cannot take any
+    n_answered = n_contributions(project_id, user_id=user_id, user_ip=user_ip)
+    if n_answered == 0:
+        return states[2]
+    if n_answered >= n_tasks(project_id):
+        return states[3]
     if n_available_tasks(project_id, user_id=user_id, user_ip=user_ip) > 0:
         return states[2]
     return states[3]
@@ -93,13 +102,3 @@ def _has_no_presenter(project):
             return 'task_presenter' not in project.get('info')
         except AttributeError:
             return True
-
-
-def _has_no_tasks(project_id):
-    """Return if a project has no tasks."""
-    query = text('''SELECT COUNT(id) AS n_tasks FROM task
-               WHERE project_id=:project_id;''')
-    result = session.execute(query, dict(project_id=project_id))
-    for row in result:
-        n_tasks = row.n_tasks
-    return n_tasks == 0
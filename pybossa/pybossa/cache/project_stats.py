@@ -20,6 +20,7 @@ from flask import current_app
 from sqlalchemy.sql import text
 from pybossa.core import db
 from pybossa.cache import memoize, ONE_DAY
+from pybossa import stats_rollups
 
 import pygeoip
 import operator
@@ -47,52 +48,25 @@ def stats_users(project_id):
     auth_users = []
     anon_users = []
 
-    # Get Authenticated Users
-    sql = text('''SELECT task_run.user_id AS user_id,
-               COUNT(task_run.id) as n_tasks FROM task_run
-               WHERE task_run.user_id IS NOT NULL AND
-               task_run.user_ip IS NULL AND
-               task_run.project_id=:project_id
-               GROUP BY task_run.user_id ORDER BY n_tasks DESC
-               LIMIT 5;''')
+    # Get Authenticated and Anonymous Users in a single pass
+    sql = text('''SELECT user_id, user_ip, COUNT(id) AS n_tasks
+               FROM task_run WHERE project_id=:project_id
+               AND (user_id IS NULL) != (user_ip IS NULL)
+               GROUP BY user_id, user_ip;''').execution_options(stream=True)
     results = session.execute(sql, dict(project_id=project_id))
 
     for row in results:
-        auth_users.append([row.user_id, row.n_tasks])
-
-    sql = text('''SELECT count(distinct(task_run.user_id)) AS user_id
-               FROM task_run WHERE task_run.user_id IS NOT NULL AND
-               task_run.user_ip IS NULL AND
-               task_run.project_id=:project_id;''')
-
-    results = session.execute(sql, dict(project_id=project_id))
-    for row in results:
-        users['n_auth'] = row[0]
-
-    # Get all Anonymous Users
-    sql = text('''SELECT task_run.user_ip AS user_ip,
-               COUNT(task_run.id) as n_tasks FROM task_run
-               WHERE task_run.user_ip IS NOT NULL AND
-               task_run.user_id IS NULL AND
-               task_run.project_id=:project_id
-               GROUP BY task_run.user_ip ORDER BY n_tasks DESC;''')\
-        .execution_options(stream=True)
-    results = session.execute(sql, dict(project_id=project_id))
-
-    for row in results:
-        anon_users.append([row.user_ip, row.n_tasks])
-
-    sql = text('''SELECT COUNT(DISTINCT(task_run.user_ip)) AS user_ip
-               FROM task_run WHERE task_run.user_ip IS NOT NULL AND
-               task_run.user_id IS NULL AND
-               task_run.project_id=:project_id;''')
-
-    results = session.execute(sql, dict(project_id=project_id))
+        if row.user_id is not None:
+            auth_users.append([row.user_id, row.n_tasks])
+        else:
+            anon_users.append([row.user_ip, row.n_tasks])
 
-    for row in results:
-        users['n_anon'] = row[0]
+    auth_users.sort(key=operator.itemgetter(1), reverse=True)
+    anon_users.sort(key=operator.itemgetter(1), reverse=True)
+    users['n_auth'] = len(auth_users)
+    users['n_anon'] = len(anon_users)
 
-    return users, anon_users, auth_users
+    return users, anon_users, auth_users[0:5]
 
 
 @memoize(timeout=ONE_DAY)
@@ -104,16 +78,55 @@ def stats_dates(project_id):
 
     n_tasks(project_id)
 
-    # Get all completed tasks
+    if stats_rollups.ready(session):
+        # Get completed tasks and answers per date from the daily rollup
+        sql = text('''SELECT to_char(day, 'YYYY-MM-DD') AS day,
+                   n_completed_tasks, n_anon_answers, n_auth_answers,
+                   day >= CURRENT_DATE - 14 AS recent
+                   FROM project_stats_day WHERE project_id=:project_id;''')
+    else:
+        # Until the rollups are filled, read the task runs of the project
+        _completed_tasks_from_task_runs(project_id, dates)
+        sql = text('''SELECT to_char(finish_time AT TIME ZONE 'UTC',
+                                     'YYYY-MM-DD') AS day,
+                   0 AS n_completed_tasks,
+                   COUNT(*) FILTER (WHERE user_id IS NULL) AS n_anon_answers,
+                   COUNT(*) FILTER (WHERE user_ip IS NULL) AS n_auth_answers,
+                   FALSE AS recent
+                   FROM task_run WHERE project_id=:project_id
+                   GROUP BY day;''')
+
+    results = session.execute(sql, dict(project_id=project_id))
+    for row in results:
+        if row.recent and row.n_completed_tasks:
+            dates[row.day] = row.n_completed_tasks
+        if row.n_anon_answers:
+            dates_anon[row.day] = row.n_anon_answers
+        if row.n_auth_answers:
+            dates_auth[row.day] = row.n_auth_answers
+
+    # No completed tasks in the last 15 days
+    if len(dates.keys()) == 0:
+        base = datetime.datetime.today()
+        for x in range(0, 15):
+            tmp_date = base - datetime.timedelta(days=x)
+            dates[tmp_date.strftime('%Y-%m-%d')] = 0
+
+    return dates, dates_anon, dates_auth
+
+
+def _completed_tasks_from_task_runs(project_id, dates):
+    """Add to dates the number of tasks completed on each of the last two
+    weeks' days, counted from the task runs."""
     sql = text('''
             WITH answers AS (
              SELECT
-             TO_DATE(task_run.finish_time, 'YYYY-MM-DD\THH24:MI:SS.US')
+             DATE(task_run.finish_time AT TIME ZONE 'UTC')
              AS day, task.id, task.n_answers AS n_answers,
              COUNT(task_run.id) AS day_answers
              FROM task_run, task WHERE task_run.project_id=:project_id
              AND task.id=task_run.task_id AND
-             TO_DATE(task_run.finish_time, 'YYYY-MM-DD\THH24:MI:SS.US') >= NOW()
+             task_run.finish_time >= NOW()
                - '2 week':: INTERVAL GROUP BY day, task.id)
             SELECT to_char(day_of_completion, 'YYYY-MM-DD') AS day,
                COUNT(task_id) AS completed_tasks FROM (
@@ -128,48 +141,10 @@ def stats_dates(project_id):
                 GROUP BY task_id) AS completed_tasks_by_day
             GROUP BY day;
                ''').execution_options(stream=True)
-
     results = session.execute(sql, dict(project_id=project_id))
     for row in results:
         dates[row.day] = row.completed_tasks
 
-    # No completed tasks in the last 15 days
-    if len(dates.keys()) == 0:
-        base = datetime.datetime.today()
-        for x in range(0, 15):
-            tmp_date = base - datetime.timedelta(days=x)
-            dates[tmp_date.strftime('%Y-%m-%d')] = 0
-
-    # Get all answers per date for auth
-    sql = text('''
-                WITH myquery AS (
-                    SELECT TO_DATE(finish_time, 'YYYY-MM-DD\THH24:MI:SS.US')
-                    as d, COUNT(id)
-                    FROM task_run WHERE project_id=:project_id
-                    AND user_ip IS NULL GROUP BY d)
-                SELECT to_char(d, 'YYYY-MM-DD') as d, count from myquery;
-               ''').execution_options(stream=True)
-
-    results = session.execute(sql, dict(project_id=project_id))
-    for row in results:
-        dates_auth[row.d] = row.count
-
-    # Get all answers per date for anon
-    sql = text('''
-                WITH myquery AS (
-                    SELECT TO_DATE(finish_time, 'YYYY-MM-DD\THH24:MI:SS.US')
-                    as d, COUNT(id)
-                    FROM task_run WHERE project_id=:project_id
-                    AND user_id IS NULL GROUP BY d)
-               SELECT to_char(d, 'YYYY-MM-DD') as d, count  from myquery;
-               ''').execution_options(stream=True)
-
-    results = session.execute(sql, dict(project_id=project_id))
-    for row in results:
-        dates_anon[row.d] = row.count
-
-    return dates, dates_anon, dates_auth
-
 
 @memoize(timeout=ONE_DAY)
 def stats_hours(project_id):
@@ -187,108 +162,36 @@ def stats_hours(project_id):
         hours_anon[str(i).zfill(2)] = 0
         hours_auth[str(i).zfill(2)] = 0
 
-    # Get hour stats for all users
-    sql = text('''
-               WITH myquery AS
-                (SELECT to_char(
-                    DATE_TRUNC('hour',
-                        TO_TIMESTAMP(finish_time, 'YYYY-MM-DD"T"HH24:MI:SS.US')
-                    ),
-                    'HH24') AS h, COUNT(id)
-                    FROM task_run WHERE project_id=:project_id GROUP BY h)
-               SELECT h, count from myquery;
-               ''').execution_options(stream=True)
-
-    results = session.execute(sql, dict(project_id=project_id))
-
-    for row in results:
-        hours[row.h] = row.count
-
-    # Get maximum stats for all users
-    sql = text('''
-               WITH myquery AS
-                (SELECT to_char(
-                    DATE_TRUNC('hour',
-                        TO_TIMESTAMP(finish_time, 'YYYY-MM-DD"T"HH24:MI:SS.US')
-                    ),
-                    'HH24') AS h, COUNT(id)
-                    FROM task_run WHERE project_id=:project_id GROUP BY h)
-               SELECT max(count) from myquery;
-               ''').execution_options(stream=True)
-
-    results = session.execute(sql, dict(project_id=project_id))
-    for row in results:
-        max_hours = row.max
-
-    # Get hour stats for Anonymous users
-    sql = text('''
-               WITH myquery AS
-                (SELECT to_char(
-                    DATE_TRUNC('hour',
-                        TO_TIMESTAMP(finish_time, 'YYYY-MM-DD"T"HH24:MI:SS.US')
-                    ),
-                    'HH24') AS h, COUNT(id)
-                    FROM task_run WHERE project_id=:project_id
-                    AND user_id IS NULL GROUP BY h)
-               SELECT h, count from myquery;
-               ''').execution_options(stream=True)
-
-    results = session.execute(sql, dict(project_id=project_id))
-
+    if stats_rollups.ready(session):
+        # Get hour stats for all, Anonymous and Auth users from the rollup
+        sql = text('''SELECT to_char(hour, 'HH24') AS h,
+                   SUM(n_answers) AS n_answers,
+                   SUM(n_anon_answers) AS n_anon_answers,
+                   SUM(n_auth_answers) AS n_auth_answers
+                   FROM project_stats_hour WHERE project_id=:project_id
+                   GROUP BY h;''')
+    else:
+        # Until the rollups are filled, read the task runs of the project
+        sql = text('''SELECT to_char(finish_time AT TIME ZONE 'UTC', 'HH24')
+                   AS h, COUNT(*) AS n_answers,
+                   COUNT(*) FILTER (WHERE user_id IS NULL) AS n_anon_answers,
+                   COUNT(*) FILTER (WHERE user_ip IS NULL) AS n_auth_answers
+                   FROM task_run WHERE project_id=:project_id
+                   GROUP BY h;''')
+
+    results = session.execute(sql, dict(project_id=project_id)).fetchall()
     for row in results:
-        hours_anon[row.h] = row.count
-
-    # Get maximum stats for Anonymous users
-    sql = text('''
-               WITH myquery AS
-                (SELECT to_char(
-                    DATE_TRUNC('hour',
-                        TO_TIMESTAMP(finish_time, 'YYYY-MM-DD"T"HH24:MI:SS.US')
-                    ),
-                    'HH24') AS h, COUNT(id)
-                    FROM task_run WHERE project_id=:project_id
-                    AND user_id IS NULL GROUP BY h)
-               SELECT max(count) from myquery;
-               ''').execution_options(stream=True)
-
-    results = session.execute(sql, dict(project_id=project_id))
-    for row in results:
-        max_hours_anon = row.max
-
-    # Get hour stats for Auth users
-    sql = text('''
-               WITH myquery AS
-                (SELECT to_char(
-                    DATE_TRUNC('hour',
-                        TO_TIMESTAMP(finish_time, 'YYYY-MM-DD"T"HH24:MI:SS.US')
-                    ),
-                    'HH24') AS h, COUNT(id)
-                    FROM task_run WHERE project_id=:project_id
-                    AND user_ip IS NULL GROUP BY h)
-               SELECT h, count from myquery;
-               ''').execution_options(stream=True)
-
-    results = session.execute(sql, dict(project_id=project_id))
-
-    for row in results:
-        hours_auth[row.h] = row.count
-
-    # Get hour stats for Anon users
-    sql = text('''
-               WITH myquery AS
-                (SELECT to_char(
-                    DATE_TRUNC('hour',
-                        TO_TIMESTAMP(finish_time, 'YYYY-MM-DD"T"HH24:MI:SS.US')
-                    ),
-                    'HH24') AS h, COUNT(id)
-                    FROM task_run WHERE project_id=:project_id
-                    AND user_ip IS NULL GROUP BY h)
-               SELECT max(count) from myquery;
-               ''').execution_options(stream=True)
-
-    results = session.execute(sql, dict(project_id=project_id))
-    for row in results:
-        max_hours_auth = row.max
+        hours[row.h] = int(row.n_answers)
+        hours_anon[row.h] = int(row.n_anon_answers)
+        hours_auth[row.h] = int(row.n_auth_answers)
+
+    # Get maximum stats (None when there are no answers)
+    if results:
+        max_hours = max(hours.values())
+        max_hours_anon = max(hours_anon.values())
+        max_hours_auth = max(hours_auth.values())
+    else:
+        max_hours = max_hours_anon = max_hours_auth = None
 
     return hours, hours_anon, hours_auth, max_hours, max_hours_anon, \
         max_hours_auth
@@ -425,12 +328,15 @@ def stats_format_users(project_id, users, anon_users, auth_users, geo=False):
             loc['longitude'] = 0
         loc_anon.append(dict(ip=u[0], loc=loc, tasks=u[1]))
 
-    for u in auth_users:
-        sql = text('''SELECT name, fullname from "user" where id=:id;''')
-        results = session.execute(sql, dict(id=u[0]))
+    names = {}
+    if auth_users:
+        sql = text('''SELECT id, name, fullname FROM "user"
+                   WHERE id = ANY(:ids);''')
+        results = session.execute(sql, dict(ids=[u[0] for u in auth_users]))
         for row in results:
-            fullname = row.fullname
-            name = row.name
+            names[row.id] = (row.name, row.fullname)
+    for u in auth_users:
+        name, fullname = names.get(u[0], (None, None))
         top5_auth.append(dict(name=name, fullname=fullname, tasks=u[1]))
 
     userAnonStats['top5'] = top5_anon[0:5]
@@ -18,6 +18,7 @@
 """Cache module for projects."""
 from sqlalchemy.sql import text
 from pybossa.core import db, timeouts
+from pybossa.model import iso_timestamp
 from pybossa.model.project import Project
 from pybossa.util import pretty_date
 from pybossa.cache import memoize, cache, delete_memoized, delete_cached
@@ -180,7 +181,7 @@ def last_activity(project_id):
     results = session.execute(sql, dict(project_id=project_id))
     for row in results:
         if row is not None:
-            return row[0]
+            return iso_timestamp(row[0])
         else:  # pragma: no cover
             return None
 
@@ -198,17 +199,8 @@ def _n_featured():
     return count
 
 
-# This function does not change too much, so cache it for a longer time
-@memoize(timeout=timeouts.get('STATS_FRONTPAGE_TIMEOUT'))
-def get_all_featured(category=None):
-    """Return a list of featured projects with a pagination."""
-    sql = text('''SELECT project.id, project.name, project.short_name, project.info,
-               project.created, project.updated, project.description,
-               "user".fullname AS owner FROM project, "user"
-               WHERE project.featured=true AND project.hidden=0
-               AND "user".id=project.owner_id GROUP BY project.id, "user".id;''')
-
-    results = session.execute(sql)
+def _format_projects(results):
+    """Return the listed projects as dicts with their card stats."""
     projects = []
     for row in results:
         project = dict(id=row.id, name=row.name, short_name=row.short_name,
@@ -221,14 +213,27 @@ def get_all_featured(category=None):
                        n_tasks=n_tasks(row.id),
                        n_volunteers=n_volunteers(row.id),
                        info=dict(json.loads(row.info)))
+        if 'featured' in row.keys():
+            project['featured'] = row.featured
         projects.append(project)
     return projects
 
 
+# This function does not change too much, so cache it for a longer time
+@memoize(timeout=timeouts.get('STATS_FRONTPAGE_TIMEOUT'))
 def get_featured(category=None, page=1, per_page=5):
     """Return a list of featured project with a pagination."""
+    sql = text('''SELECT project.id, project.name, project.short_name, project.info,
+               project.created, project.updated, project.description,
+               "user".fullname AS owner FROM project, "user"
+               WHERE project.featured=true AND project.hidden=0
+               AND "user".id=project.owner_id
+               ORDER BY project.rank_score DESC, project.name
+               LIMIT :limit OFFSET :offset;''')
+
     offset = (page - 1) * per_page
-    return get_all_featured()[offset:offset+per_page]
+    results = session.execute(sql, dict(limit=per_page, offset=offset))
+    return _format_projects(results)
 
 
 @cache(key_prefix="number_published_projects",
@@ -236,11 +241,8 @@ def get_featured(category=None, page=1, per_page=5):
 def n_published():
     """Return number of published projects."""
     sql = text('''
-               WITH published_projects as
-               (SELECT project.id FROM project, task WHERE
-               project.id=task.project_id AND project.hidden=0 AND project.info
-               LIKE('%task_presenter%') GROUP BY project.id)
-               SELECT COUNT(id) FROM published_projects;
+               SELECT COUNT(id) FROM project WHERE project.hidden=0
+               AND project.has_presenter AND project.n_tasks > 0;
                ''')
 
     results = session.execute(sql)
@@ -255,9 +257,8 @@ def n_published():
 def _n_draft():
     """Return number of draft projects."""
     sql = text('''SELECT COUNT(project.id) FROM project
-               LEFT JOIN task on project.id=task.project_id
-               WHERE task.project_id IS NULL
-               AND project.info NOT LIKE('%task_presenter%')
+               WHERE project.n_tasks=0
+               AND NOT project.has_presenter
                AND project.hidden=0;''')
 
     results = session.execute(sql)
@@ -267,37 +268,21 @@ def _n_draft():
 
 
 @memoize(timeout=timeouts.get('STATS_FRONTPAGE_TIMEOUT'))
-def get_all_draft(category=None):
-    """Return list of all draft projects."""
+def get_draft(category=None, page=1, per_page=5):
+    """Return a list of draft project with a pagination."""
     sql = text('''SELECT project.id, project.name, project.short_name, project.created,
                project.description, project.info, project.updated, "user".fullname as owner
-               FROM "user", project LEFT JOIN task ON project.id=task.project_id
-               WHERE task.project_id IS NULL
-               AND project.info NOT LIKE('%task_presenter%')
+               FROM "user", project
+               WHERE project.n_tasks=0
+               AND NOT project.has_presenter
                AND project.hidden=0
-               AND project.owner_id="user".id;''')
-
-    results = session.execute(sql)
-    projects = []
-    for row in results:
-        project = dict(id=row.id, name=row.name, short_name=row.short_name,
-                       created=row.created,
-                       updated=row.updated,
-                       description=row.description,
-                       owner=row.owner,
-                       last_activity=pretty_date(last_activity(row.id)),
-                       last_activity_raw=last_activity(row.id),
-                       overall_progress=overall_progress(row.id),
-                       n_tasks=n_tasks(row.id),
-                       n_volunteers=n_volunteers(row.id),
-                       info=dict(json.loads(row.info)))
-        projects.append(project)
-    return projects
+               AND project.owner_id="user".id
+               ORDER BY project.rank_score DESC, project.name
+               LIMIT :limit OFFSET :offset;''')
 
-def get_draft(category=None, page=1, per_page=5):
-    """Return a list of draft project with a pagination."""
     offset = (page - 1) * per_page
-    return get_all_draft()[offset:offset+per_page]
+    results = session.execute(sql, dict(limit=per_page, offset=offset))
+    return _format_projects(results)
 
 
 @memoize(timeout=timeouts.get('N_APPS_PER_CATEGORY_TIMEOUT'))
@@ -308,16 +293,13 @@ def n_count(category):
     if category == 'draft':
         return _n_draft()
     sql = text('''
-               WITH uniq AS (
-               SELECT COUNT(project.id) FROM task, project
-               LEFT OUTER JOIN category ON project.category_id=category.id
+               SELECT COUNT(project.id) FROM project
+               JOIN category ON project.category_id=category.id
                WHERE
                category.short_name=:category
                AND project.hidden=0
-               AND project.info LIKE('%task_presenter%')
-               AND task.project_id=project.id
-               GROUP BY project.id)
-               SELECT COUNT(*) FROM uniq
+               AND project.has_presenter
+               AND project.n_tasks > 0
                ''')
 
     results = session.execute(sql, dict(category=category))
@@ -328,48 +310,28 @@ def n_count(category):
 
 
 @memoize(timeout=timeouts.get('APP_TIMEOUT'))
-def get_all(category):
+def get(category, page=1, per_page=5):
     """Return a list of projects with at least one task and a task_presenter.
+    It also returns  a pagination for a given category.
     """
     sql = text('''SELECT project.id, project.name, project.short_name,
                project.description, project.info, project.created, project.updated,
                project.category_id, project.featured, "user".fullname AS owner
-               FROM "user", task, project
-               LEFT OUTER JOIN category ON project.category_id=category.id
+               FROM "user", project
+               JOIN category ON project.category_id=category.id
                WHERE
                category.short_name=:category
                AND project.hidden=0
                AND "user".id=project.owner_id
-               AND project.info LIKE('%task_presenter%')
-               AND task.project_id=project.id
-               GROUP BY project.id, "user".id ORDER BY project.name;''')
+               AND project.has_presenter
+               AND project.n_tasks > 0
+               ORDER BY project.rank_score DESC, project.name
+               LIMIT :limit OFFSET :offset;''')
 
-    results = session.execute(sql, dict(category=category))
-    projects = []
-    for row in results:
-        project = dict(id=row.id,
-                       name=row.name, short_name=row.short_name,
-                       created=row.created,
-                       updated=row.updated,
-                       description=row.description,
-                       owner=row.owner,
-                       featured=row.featured,
-                       last_activity=pretty_date(last_activity(row.id)),
-                       last_activity_raw=last_activity(row.id),
-                       overall_progress=overall_progress(row.id),
-                       n_tasks=n_tasks(row.id),
-                       n_volunteers=n_volunteers(row.id),
-                       info=dict(json.loads(row.info)))
-        projects.append(project)
-    return projects
-
-
-def get(category, page=1, per_page=5):
-    """Return a list of projects with at least one task and a task_presenter.
-    It also returns  a pagination for a given category.
-    """
     offset = (page - 1) * per_page
-    return get_all(category)[offset:offset+per_page]
+    results = session.execute(sql, dict(category=category, limit=per_page,
+                                        offset=offset))
+    return _format_projects(results)
 
 
 # TODO: find a convenient cache timeout and cache, if needed
@@ -393,10 +355,10 @@ def reset():
     delete_cached('number_featured_projects')
     delete_cached('number_published_projects')
     delete_cached('number_draft_projects')
-    delete_memoized(get_all_featured)
-    delete_memoized(get_all_draft)
+    delete_memoized(get_featured)
+    delete_memoized(get_draft)
     delete_memoized(n_count)
-    delete_memoized(get_all)
+    delete_memoized(get)
 
 
 def delete_project(short_name):
@@ -20,6 +20,7 @@ from sqlalchemy.sql import text
 from pybossa.core import db, timeouts
 from pybossa.cache import cache, memoize, delete_memoized
 from pybossa.util import pretty_date
+from pybossa import leaderboard
 from pybossa.model.user import User
 from pybossa.cache.projects import overall_progress, n_tasks, n_volunteers
 import json
@@ -31,51 +32,31 @@ session = db.slave_session
 @memoize(timeout=timeouts.get('USER_TIMEOUT'))
 def get_leaderboard(n, user_id):
     """Return the top n users with their rank."""
-    sql = text('''
-               WITH global_rank AS (
-                    WITH scores AS (
-                        SELECT user_id, COUNT(*) AS score FROM task_run
-                        WHERE user_id IS NOT NULL GROUP BY user_id)
-                    SELECT user_id, score, rank() OVER (ORDER BY score desc)
-                    FROM scores)
-               SELECT rank, id, name, fullname, email_addr, info,
-               score FROM global_rank
-               JOIN public."user" on (user_id=public."user".id) ORDER BY rank
-               LIMIT :limit;
-               ''')
-
-    results = session.execute(sql, dict(limit=n))
+    top = leaderboard.get_top(n)
+    sql = text('''SELECT id, name, fullname, email_addr, info FROM "user"
+               WHERE id = ANY(:ids);''')
+    results = session.execute(sql, dict(ids=[u[0] for u in top]))
+    users = dict((row.id, row) for row in results)
 
     top_users = []
     user_in_top = False
-    for row in results:
+    for _id, score, rank in top:
+        row = users.get(_id)
+        if row is None:  # pragma: no cover
+            continue
         if (row.id == user_id):
             user_in_top = True
         user = dict(
-            rank=row.rank,
+            rank=rank,
             id=row.id,
             name=row.name,
             fullname=row.fullname,
             email_addr=row.email_addr,
             info=dict(json.loads(row.info)),
-            score=row.score)
+            score=score)
         top_users.append(user)
     if (user_id != 'anonymous'):
         if not user_in_top:
-            sql = text('''
-                       WITH global_rank AS (
-                            WITH scores AS (
-                                SELECT user_id, COUNT(*) AS score FROM task_run
-                                WHERE user_id IS NOT NULL GROUP BY user_id)
-                            SELECT user_id, score, rank() OVER
-                                (ORDER BY score desc)
-                            FROM scores)
-                       SELECT rank, id, name, fullname, email_addr, info,
-                              score FROM global_rank
-                       JOIN public."user" on (user_id=public."user".id)
-                       WHERE user_id=:user_id ORDER BY rank;
-                       ''')
-            user_rank = session.execute(sql, dict(user_id=user_id))
             u = User.query.get(user_id)
             # Load by default user data with no rank
             user = dict(
@@ -86,15 +67,9 @@ def get_leaderboard(n, user_id):
                 email_addr=u.email_addr,
                 info=u.info,
                 score=-1)
-            for row in user_rank:  # pragma: no cover
-                user = dict(
-                    rank=row.rank,
-                    id=row.id,
-                    name=row.name,
-                    fullname=row.fullname,
-                    email_addr=row.email_addr,
-                    info=dict(json.loads(row.info)),
-                    score=row.score)
+            user_rank = leaderboard.get_rank_and_score(user_id)
+            if user_rank['rank'] is not None:  # pragma: no cover
+                user.update(user_rank)
             top_users.append(user)
 
     return top_users
@@ -162,22 +137,7 @@ def get_user_summary(name):
 @memoize(timeout=timeouts.get('USER_TIMEOUT'))
 def rank_and_score(user_id):
     """Return rank and score for a user."""
-    # See: https://gist.github.com/tokumine/1583695
-    sql = text('''
-               WITH global_rank AS (
-                    WITH scores AS (
-                        SELECT user_id, COUNT(*) AS score FROM task_run
-                        WHERE user_id IS NOT NULL GROUP BY user_id)
-                    SELECT user_id, score, rank() OVER (ORDER BY score desc)
-                    FROM scores)
-               SELECT * from global_rank WHERE user_id=:user_id;
-               ''')
-    results = session.execute(sql, dict(user_id=user_id))
-    rank_and_score = dict(rank=None, score=None)
-    for row in results:
-        rank_and_score['rank'] = row.rank
-        rank_and_score['score'] = row.score
-    return rank_and_score
+    return leaderboard.get_rank_and_score(user_id)
 
 
 def projects_contributed(user_id):
@@ -216,12 +176,9 @@ def published_projects(user_id):
                SELECT project.id, project.name, project.short_name, project.description,
                project.owner_id,
                project.info
-               FROM project, task
-               WHERE project.id=task.project_id AND project.owner_id=:user_id AND
-               project.hidden=0 AND project.info LIKE('%task_presenter%')
-               GROUP BY project.id, project.name, project.short_name,
-               project.description,
-               project.info;''')
+               FROM project
+               WHERE project.owner_id=:user_id AND project.n_tasks > 0 AND
+               project.hidden=0 AND project.has_presenter;''')
     projects_published = []
     results = session.execute(sql, dict(user_id=user_id))
     for row in results:
@@ -250,10 +207,7 @@ def draft_projects(user_id):
                project.info
                FROM project
                WHERE project.owner_id=:user_id
-               AND project.info NOT LIKE('%task_presenter%')
-               GROUP BY project.id, project.name, project.short_name,
-               project.description,
-               project.info;''')
+               AND NOT project.has_presenter;''')
     projects_draft = []
     results = session.execute(sql, dict(user_id=user_id))
     for row in results:
@@ -280,12 +234,9 @@ def hidden_projects(user_id):
                SELECT project.id, project.name, project.short_name, project.description,
                project.owner_id,
                project.info
-               FROM project, task
-               WHERE project.id=task.project_id AND project.owner_id=:user_id AND
-               project.hidden=1 AND project.info LIKE('%task_presenter%')
-               GROUP BY project.id, project.name, project.short_name,
-               project.description,
-               project.info;''')
+               FROM project
+               WHERE project.owner_id=:user_id AND project.n_tasks > 0 AND
+               project.hidden=1 AND project.has_presenter;''')
     projects_published = []
     results = session.execute(sql, dict(user_id=user_id))
     for row in results:
@@ -335,6 +286,38 @@ def get_users_page(page, per_page=24):
     return accounts
 
 
+API_KEY_IDENTITY = ('id', 'name', 'locale', 'api_key', 'admin', 'subadmin',
+                    'pro')
+
+
+@memoize(timeout=timeouts.get('API_KEY_TIMEOUT'),
+         miss_timeout=timeouts.get('API_KEY_MISS_TIMEOUT'))
+def get_identity_by_api_key(api_key):
+    """Return the API_KEY_IDENTITY columns of the user owning api_key, or
+    None."""
+    columns = [getattr(User, column) for column in API_KEY_IDENTITY]
+    row = session.query(*columns).filter_by(api_key=api_key).first()
+    return dict(zip(API_KEY_IDENTITY, row)) if row else None
+
+
+def get_by_api_key(api_key):
+    """Return the user owning api_key, or None.
+
+    The user is built from its cached identity and is not bound to a
+    session, so only the API_KEY_IDENTITY attributes are set. Unknown keys
+    are cached for API_KEY_MISS_TIMEOUT seconds only, as a key that was just
+    reset may not have reached the replica yet."""
+    identity = get_identity_by_api_key(api_key)
+    if identity is None:
+        return None
+    return User(**identity)
+
+
+def delete_api_key(api_key):
+    """Delete from cache the user of api_key."""
+    delete_memoized(get_identity_by_api_key, api_key)
+
+
 def delete_user_summary(name):
     """Delete from cache the user summary."""
     delete_memoized(get_user_summary, name)
@@ -0,0 +1,137 @@
+# -*- coding: utf8 -*-
+# This file is part of PyBossa.
+#
+# Copyright (C) 2015 SF Isle of Man Limited
+#
+# PyBossa is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyBossa is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
+"""Per user contribution counters of projects, stored in Redis.
+
+Each project has a hash with the number of task runs submitted by every
+authenticated user (user:<id>) and anonymous user (ip:<address>). A hash is
+loaded from the database the first time it is read, incremented as task runs
+are created and periodically reconciled with the database."""
+from sqlalchemy import text
+from pybossa.core import db, sentinel
+
+
+CONTRIBUTIONS_KEY = 'pybossa:project:%s:contributions'
+# Marks a loaded hash, so projects without contributions are cached too
+LOADED_FIELD = '_loaded'
+
+# ARGV: field, count pairs. Fields set meanwhile are not overwritten.
+LOAD_LUA = """
+for i = 1, #ARGV, 2 do
+    redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+"""
+
+# ARGV: field, count pairs. Fields not in the database are dropped.
+RELOAD_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return
+end
+local counts = {}
+for i = 1, #ARGV, 2 do
+    counts[ARGV[i]] = ARGV[i + 1]
+end
+for _, field in ipairs(redis.call('HKEYS', KEYS[1])) do
+    if not counts[field] then
+        redis.call('HDEL', KEYS[1], field)
+    end
+end
+for field, count in pairs(counts) do
+    redis.call('HSET', KEYS[1], field, count)
+end
+"""
+
+_scripts = {}
+
+
+def _contributor(user_id=None, user_ip=None):
+    if user_id is not None:
+        return 'user:%s' % user_id
+    return 'ip:%s' % (user_ip or '127.0.0.1')
+
+
+def _count(project_id):
+    """Return the contribution counters of a project in the database, read
+    from the primary so that the newest task runs are counted."""
+    sql = text('''SELECT user_id, user_ip, COUNT(*) AS n_task_runs
+               FROM task_run WHERE project_id=:project_id
+               GROUP BY user_id, user_ip;''')
+    results = db.session.execute(sql, dict(project_id=project_id))
+    mapping = {LOADED_FIELD: 1}
+    for row in results:
+        field = _contributor(row.user_id, row.user_ip)
+        mapping[field] = mapping.get(field, 0) + row.n_task_runs
+    return mapping
+
+
+def _script(lua):
+    if lua not in _scripts:
+        _scripts[lua] = sentinel.master.register_script(lua)
+    return _scripts[lua]
+
+
+def load(project_id):
+    """Load the contribution counters of a project from the database.
+
+    Counters already in Redis, from a concurrent load, are left as they are."""
+    mapping = _count(project_id)
+    args = []
+    for field, count in mapping.items():
+        args.extend([field, count])
+    _script(LOAD_LUA)(keys=[CONTRIBUTIONS_KEY % project_id], args=args)
+
+
+def _reload(project_id):
+    """Set the loaded counters of a project to the database counts.
+
+    The database is read first, so a task run is never counted twice: one
+    counted while the database is read may be missed until the next
+    reconciliation instead."""
+    mapping = _count(project_id)
+    args = []
+    for field, count in mapping.items():
+        args.extend([field, count])
+    _script(RELOAD_LUA)(keys=[CONTRIBUTIONS_KEY % project_id], args=args)
+
+
+def increment(project_id, user_id=None, user_ip=None):
+    """Count a new task run of a user, if the project counters are loaded."""
+    key = CONTRIBUTIONS_KEY % project_id
+    if sentinel.master.exists(key):
+        sentinel.master.hincrby(key, _contributor(user_id, user_ip), 1)
+
+
+def n_contributions(project_id, user_id=None, user_ip=None):
+    """Return the number of task runs a user has submitted to a project."""
+    key = CONTRIBUTIONS_KEY % project_id
+    if not sentinel.master.exists(key):
+        load(project_id)
+    return int(sentinel.master.hget(key, _contributor(user_id, user_ip)) or 0)
+
+
+def forget(project_id):
+    """Drop the counters of a project, to be loaded again when read."""
+    sentinel.master.delete(CONTRIBUTIONS_KEY % project_id)
+
+
+def reconcile():
+    """Reload the counters of every loaded project from the database."""
+    n_projects = 0
+    for key in sentinel.slave.scan_iter(match=CONTRIBUTIONS_KEY % '*'):
+        _reload(int(key.split(':')[2]))
+        n_projects += 1
+    return "%s project contribution counters reconciled" % n_projects
@@ -192,6 +192,7 @@ def setup_db(app):
         options = dict(bind=engine, scopefunc=_app_ctx_stack.__ident_func__)
         slave_session = db.create_scoped_session(options=options)
         return slave_session
+    _read_jsonb_as_text()
     db.app = app
     db.init_app(app)
     db.slave_session = create_slave_session(db, bind='slave')
@@ -206,6 +207,17 @@ def setup_db(app):
             return response_or_exc
 
 
+def _read_jsonb_as_text():
+    """Have the driver return jsonb values as JSON text, as it does for the
+    text columns they replace, so raw SQL reading info keeps working and
+    JSONType can pass the stored text through."""
+    try:
+        from psycopg2.extras import register_default_jsonb
+    except ImportError:  # pragma: no cover
+        return
+    register_default_jsonb(loads=lambda value: value, globally=True)
+
+
 def setup_repositories():
     """Setup repositories."""
     from pybossa.repositories import UserRepository
@@ -449,12 +461,16 @@ def setup_hooks(app):
     @app.before_request
     def _api_authentication():
         """ Attempt API authentication on a per-request basis."""
+        # Only the API accepts api keys
+        if request.blueprint != 'api':
+            return
         apikey = request.args.get('api_key', None)
         from flask import _request_ctx_stack
+        from pybossa.cache import users as cached_users
         if 'Authorization' in request.headers:
             apikey = request.headers.get('Authorization')
         if apikey:
-            user = user_repo.get_by(api_key=apikey)
+            user = cached_users.get_by_api_key(apikey)
             if user:
                 _request_ctx_stack.top.user = user
 
@@ -533,6 +549,8 @@ def setup_ratelimits(app):
     global ratelimits
     ratelimits['LIMIT'] = app.config['LIMIT']
     ratelimits['PER'] = app.config['PER']
+    ratelimits['LOCAL_BATCH'] = app.config.get('LIMIT_LOCAL_BATCH', 0)
+    ratelimits['REDIS_BACKOFF'] = app.config.get('LIMIT_REDIS_BACKOFF', 5)
 
 
 def setup_cache_timeouts(app):
@@ -555,6 +573,12 @@ def setup_cache_timeouts(app):
     timeouts['USER_TIMEOUT'] = app.config['USER_TIMEOUT']
     timeouts['USER_TOP_TIMEOUT'] = app.config['USER_TOP_TIMEOUT']
     timeouts['USER_TOTAL_TIMEOUT'] = app.config['USER_TOTAL_TIMEOUT']
+    timeouts['FEED_TIMEOUT'] = app.config.get('FEED_TIMEOUT', 60)
+    # API
+    timeouts['API_ANON_TIMEOUT'] = app.config.get('API_ANON_TIMEOUT', 0)
+    timeouts['API_KEY_TIMEOUT'] = app.config.get('API_KEY_TIMEOUT', 5 * 60)
+    timeouts['API_KEY_MISS_TIMEOUT'] = app.config.get('API_KEY_MISS_TIMEOUT',
+                                                      5)
 
 
 def setup_scheduled_jobs(app):  # pragma: no cover
@@ -29,61 +29,77 @@ def _exists_materialized_view(view):
     return False
 
 
-def _refresh_materialized_view(view):
-    sql = text('REFRESH MATERIALIZED VIEW %s' % view)
+def _create_unique_index(view, key):
+    """Create the unique index needed to refresh a view concurrently."""
+    index = '%s_key' % view
+    sql = text('''SELECT EXISTS (SELECT indexname FROM pg_indexes WHERE
+               indexname=:index);''')
+    for result in db.session.execute(sql, dict(index=index)):
+        if result.exists:
+            return
+    sql = text('CREATE UNIQUE INDEX %s ON %s (%s)' % (index, view, key))
+    db.session.execute(sql)
+    db.session.commit()
+
+
+def _refresh_materialized_view(view, key):
+    """Refresh a view without locking out its readers."""
+    _create_unique_index(view, key)
+    sql = text('REFRESH MATERIALIZED VIEW CONCURRENTLY %s' % view)
     db.session.execute(sql)
     db.session.commit()
     return "Materialized view refreshed"
 
 
+def _create_materialized_view(view, key, sql):
+    db.session.execute(sql)
+    db.session.commit()
+    _create_unique_index(view, key)
+    return "Materialized view created"
+
+
 def active_users_week():
     """Create or update active users last week materialized view."""
     if _exists_materialized_view('dashboard_week_users'):
-        return _refresh_materialized_view('dashboard_week_users')
+        return _refresh_materialized_view('dashboard_week_users', 'day')
     else:
         sql = text('''CREATE MATERIALIZED VIEW dashboard_week_users AS
                    WITH crafters_per_day AS
-                        (select to_date(task_run.finish_time,
-                                        'YYYY-MM-DD\THH24:MI:SS.US') AS day,
+                        (select DATE(task_run.finish_time
+                                     AT TIME ZONE 'UTC') AS day,
                                 user_id, COUNT(task_run.user_id) AS day_crafters
                         FROM task_run
-                        WHERE to_date(task_run.finish_time,
-                                      'YYYY-MM-DD\THH24:MI:SS.US')
+                        WHERE task_run.finish_time
                             >= NOW() - ('1 week'):: INTERVAL
                         GROUP BY day, task_run.user_id)
                    SELECT day, COUNT(crafters_per_day.user_id) AS n_users
                    FROM crafters_per_day GROUP BY day ORDER BY day;''')
-        db.session.execute(sql)
-        db.session.commit()
-        return "Materialized view created"
+        return _create_materialized_view('dashboard_week_users', 'day', sql)
 
 
 def active_anon_week():
     """Create or update active anon last week materialized view."""
     if _exists_materialized_view('dashboard_week_anon'):
-        return _refresh_materialized_view('dashboard_week_anon')
+        return _refresh_materialized_view('dashboard_week_anon', 'day')
     else:
         sql = text('''CREATE MATERIALIZED VIEW dashboard_week_anon AS
                    WITH crafters_per_day AS
-                        (select to_date(task_run.finish_time,
-                                        'YYYY-MM-DD\THH24:MI:SS.US') AS day,
+                        (select DATE(task_run.finish_time
+                                     AT TIME ZONE 'UTC') AS day,
                                 user_ip, COUNT(task_run.user_ip) AS day_crafters
                         FROM task_run
-                        WHERE to_date(task_run.finish_time,
-                                      'YYYY-MM-DD\THH24:MI:SS.US')
+                        WHERE task_run.finish_time
                             >= NOW() - ('1 week'):: INTERVAL
                         GROUP BY day, task_run.user_ip)
                    SELECT day, COUNT(crafters_per_day.user_ip) AS n_users
                    FROM crafters_per_day GROUP BY day ORDER BY day;''')
-        db.session.execute(sql)
-        db.session.commit()
-        return "Materialized view created"
+        return _create_materialized_view('dashboard_week_anon', 'day', sql)
 
 
 def new_projects_week():
     """Create or update new created projects last week materialized view."""
     if _exists_materialized_view('dashboard_week_project_new'):
-        return _refresh_materialized_view('dashboard_week_project_new')
+        return _refresh_materialized_view('dashboard_week_project_new', 'id')
     else:
         sql = text('''CREATE MATERIALIZED VIEW dashboard_week_project_new AS
                    SELECT TO_DATE(project.created, 'YYYY-MM-DD\THH24:MI:SS.US') as day,
@@ -95,15 +111,15 @@ def new_projects_week():
                                 ('1 week')::INTERVAL
                    AND "user".id=project.owner_id
                    GROUP BY project.id, "user".name, "user".email_addr;''')
-        db.session.execute(sql)
-        db.session.commit()
-        return "Materialized view created"
+        return _create_materialized_view('dashboard_week_project_new',
+                                         'id', sql)
 
 
 def update_projects_week():
     """Create or update updated projects last week materialized view."""
     if _exists_materialized_view('dashboard_week_project_update'):
-        return _refresh_materialized_view('dashboard_week_project_update')
+        return _refresh_materialized_view('dashboard_week_project_update',
+                                          'id')
     else:
         sql = text('''CREATE MATERIALIZED VIEW dashboard_week_project_update AS
                    SELECT TO_DATE(project.updated, 'YYYY-MM-DD\THH24:MI:SS.US') as day,
@@ -115,15 +131,14 @@ def update_projects_week():
                                 ('1 week')::INTERVAL
                    AND "user".id=project.owner_id
                    GROUP BY project.id, "user".name, "user".email_addr;''')
-        db.session.execute(sql)
-        db.session.commit()
-        return "Materialized view created"
+        return _create_materialized_view('dashboard_week_project_update',
+                                         'id', sql)
 
 
 def new_tasks_week():
     """Create or update new tasks last week materialized view."""
     if _exists_materialized_view('dashboard_week_new_task'):
-        return _refresh_materialized_view('dashboard_week_new_task')
+        return _refresh_materialized_view('dashboard_week_new_task', 'day')
     else:
         sql = text('''CREATE MATERIALIZED VIEW dashboard_week_new_task AS
                       SELECT TO_DATE(task.created,
@@ -133,33 +148,29 @@ def new_tasks_week():
                                               'YYYY-MM-DD\THH24:MI:SS.US')
                                           >= now() - ('1 week'):: INTERVAL
                       GROUP BY day ORDER BY day ASC;''')
-        db.session.execute(sql)
-        db.session.commit()
-        return "Materialized view created"
+        return _create_materialized_view('dashboard_week_new_task', 'day', sql)
 
 
 def new_task_runs_week():
     """Create or update new task_runs last week materialized view."""
     if _exists_materialized_view('dashboard_week_new_task_run'):
-        return _refresh_materialized_view('dashboard_week_new_task_run')
+        return _refresh_materialized_view('dashboard_week_new_task_run', 'day')
     else:
         sql = text('''CREATE MATERIALIZED VIEW dashboard_week_new_task_run AS
-                      SELECT TO_DATE(task_run.finish_time,
-                                     'YYYY-MM-DD\THH24:MI:SS.US') AS day,
+                      SELECT DATE(task_run.finish_time
+                                  AT TIME ZONE 'UTC') AS day,
                       COUNT(task_run.id) AS day_task_runs
-                      FROM task_run WHERE TO_DATE(task_run.finish_time,
-                                              'YYYY-MM-DD\THH24:MI:SS.US')
+                      FROM task_run WHERE task_run.finish_time
                                           >= now() - ('1 week'):: INTERVAL
                       GROUP BY day;''')
-        db.session.execute(sql)
-        db.session.commit()
-        return "Materialized view created"
+        return _create_materialized_view('dashboard_week_new_task_run',
+                                         'day', sql)
 
 
 def new_users_week():
     """Create or update new users last week materialized view."""
     if _exists_materialized_view('dashboard_week_new_users'):
-        return _refresh_materialized_view('dashboard_week_new_users')
+        return _refresh_materialized_view('dashboard_week_new_users', 'day')
     else:
         sql = text('''CREATE MATERIALIZED VIEW dashboard_week_new_users AS
                       SELECT TO_DATE("user".created,
@@ -169,28 +180,26 @@ def new_users_week():
                                               'YYYY-MM-DD\THH24:MI:SS.US')
                                           >= now() - ('1 week'):: INTERVAL
                       GROUP BY day;''')
-        db.session.execute(sql)
-        db.session.commit()
-        return "Materialized view created"
+        return _create_materialized_view('dashboard_week_new_users',
+                                         'day', sql)
 
 
 def returning_users_week():
     """Create or update returning users last week materialized view."""
     if _exists_materialized_view('dashboard_week_returning_users'):
-        return _refresh_materialized_view('dashboard_week_returning_users')
+        return _refresh_materialized_view('dashboard_week_returning_users',
+                                          'user_id')
     else:
         sql = text('''CREATE MATERIALIZED VIEW dashboard_week_returning_users AS
                    WITH data AS (
-                    SELECT user_id, TO_DATE(task_run.finish_time,
-                    'YYYY-MM-DD\THH24:MI:SS.US') AS day
+                    SELECT user_id, DATE(task_run.finish_time
+                    AT TIME ZONE 'UTC') AS day
                    FROM task_run
-                   WHERE TO_DATE(task_run.finish_time,
-                   'YYYY-MM-DD\THH24:MI:SS.US') >= NOW()
+                   WHERE task_run.finish_time >= NOW()
                    - ('1 week')::INTERVAL GROUP BY day, task_run.user_id)
                    SELECT user_id, COUNT(user_id) AS n_days
                    FROM data GROUP BY user_id HAVING(count(user_id) > 1)
                    ORDER by n_days;
                       ''')
-        db.session.execute(sql)
-        db.session.commit()
-        return "Materialized view created"
+        return _create_materialized_view('dashboard_week_returning_users',
+                                         'user_id', sql)
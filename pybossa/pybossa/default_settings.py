@@ -78,6 +78,16 @@ CATEGORY_TIMEOUT = 24 * 60 * 60
 USER_TIMEOUT = 15 * 60
 USER_TOP_TIMEOUT = 24 * 60 * 60
 USER_TOTAL_TIMEOUT = 24 * 60 * 60
+FEED_TIMEOUT = 60
+# Shared cache of anonymous API GET responses (0 disables it). Writes
+# through the API invalidate the cache of the written resource only: other
+# resources derived from it (e.g. the state of a task after a task run is
+# posted) and changes made outside the API are served stale for up to
+# API_ANON_TIMEOUT seconds.
+API_ANON_TIMEOUT = 0
+API_KEY_TIMEOUT = 5 * 60
+# Unknown api keys are cached for a few seconds only
+API_KEY_MISS_TIMEOUT = 5
 
 # Project Presenters
 PRESENTERS = ["basic", "image", "sound", "video", "map", "pdf"]
@@ -92,6 +102,11 @@ TEMPLATE_TASKS = {
 # Rate limits default values
 LIMIT = 300
 PER = 15 * 60
+# Hits a process may count locally before sending them to Redis, while a
+# caller is under half of its limit (0 sends every hit)
+LIMIT_LOCAL_BATCH = 0
+# Seconds requests are not rate limited after a Redis failure
+LIMIT_REDIS_BACKOFF = 5
 
 # Expiration time for password protected project cookies
 PASSWD_COOKIE_TIMEOUT = 60 * 30
@@ -50,7 +50,7 @@ class CsvExporter(Exporter):
         for k in tmp:
             k = "%s__%s" % (ty, k)
             task_keys.append(k)
-        if (type(row['info']) == dict):
+        if (isinstance(row['info'], dict)):
             task_info_keys = []
             tmp = row['info'].keys()
             for k in tmp:
@@ -121,7 +121,7 @@ class CsvExporter(Exporter):
                     for k in tmp:
                         k = "%s__%s" % (ty, k)
                         task_keys.append(k)
-                    if (type(t.info) == dict):
+                    if (isinstance(t.info, dict)):
                         task_info_keys = []
                         tmp = t.info.keys()
                         for k in tmp:
@@ -283,7 +283,7 @@ class CsvExporter(Exporter):
             
     def _write_csv_header(self, writer, row):
        if row is not None:
-          if (type(row) == dict):
+          if (isinstance(row, dict)):
              keys = row.keys() #keys = sorted(row.keys())
              writer.writerow(keys)
              return keys
@@ -295,7 +295,7 @@ class CsvExporter(Exporter):
 
     def _write_csv_value(self, writer, row):
        if row is not None:
-          if (type(row) == dict):
+          if (isinstance(row, dict)):
              keys = row.keys() #keys = sorted(row.keys())
              values = []
              if keys is not None:
@@ -32,6 +32,7 @@ from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 from sqlalchemy.sql import text
 from pybossa.core import db
+from pybossa.model import iso_timestamp
 
 class JsonExporter(Exporter):
     def _gen_json(self, table, id):
@@ -365,7 +366,8 @@ class JsonExporter(Exporter):
                     #data += row2.info 
                 rnum += 1
                 userinfo += '{' + user_cache[row2.user_id] + \
-                            ', task_completed_on: ' + row2.finish_time + '}'
+                            ', task_completed_on: ' + \
+                            iso_timestamp(row2.finish_time) + '}'
                 userinfo += sep2
                 j += 1
             jstr3 += userinfo + '}"}'
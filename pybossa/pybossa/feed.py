@@ -15,32 +15,82 @@
 #
 # You should have received a copy of the GNU Affero General Public License
 # along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
+"""Activity feed of the site and of each project, stored in Redis.
+
+Each feed is a sorted set of compact JSON entries scored by the time they
+were added, trimmed to its MAX_FEED_LENGTH most recent entries as entries
+are added. Entries only keep the fields and info keys the feed is rendered
+with."""
 import json
 from time import time
-from pybossa.core import sentinel
-try:
-    import cPickle as pickle
-except ImportError:  # pragma: no cover
-    import pickle
+from pybossa.core import sentinel, timeouts
+from pybossa.cache import memoize
+
+
+FEED_KEY = 'pybossa:feed'
+PROJECT_FEED_KEY = 'pybossa:feed:project:%s'
+MAX_FEED_LENGTH = 1000
+FEED_FIELDS = ('id', 'name', 'short_name', 'fullname', 'project_id',
+               'project_name', 'project_short_name', 'action_updated')
+FEED_INFO_KEYS = ('avatar', 'container', 'thumbnail')
+# Actions whose object id is the id of a project
+PROJECT_ACTIONS = ('Project', 'Blog', 'Task', 'TaskCompleted')
+
 
+def _compact(obj):
+    entry = dict((k, obj[k]) for k in FEED_FIELDS if obj.get(k) is not None)
+    info = obj.get('info')
+    if isinstance(info, basestring):
+        info = json.loads(info)
+    if info:
+        entry['info'] = dict((k, info[k]) for k in FEED_INFO_KEYS
+                             if info.get(k) is not None)
+    # Sorted keys, so a repeated event updates its entry instead of adding
+    return json.dumps(entry, sort_keys=True, separators=(',', ':'))
+
+
+def _project_id(obj):
+    if obj.get('action_updated') in PROJECT_ACTIONS:
+        return obj.get('id')
+    return obj.get('project_id')
 
-FEED_KEY = 'pybossa_feed'
 
 def update_feed(obj):
-    """Add domain object to update feed in Redis."""
+    """Add domain object to the update feeds in Redis."""
+    entry = _compact(obj)
+    keys = [FEED_KEY]
+    project_id = _project_id(obj)
+    if project_id is not None:
+        keys.append(PROJECT_FEED_KEY % project_id)
+    now = time()
     pipeline = sentinel.master.pipeline()
-    serialized_object = pickle.dumps(obj)
-    pipeline.zadd(FEED_KEY, time(), serialized_object)
+    for key in keys:
+        pipeline.zadd(key, now, entry)
+        pipeline.zremrangebyrank(key, 0, -(MAX_FEED_LENGTH + 1))
     pipeline.execute()
 
-def get_update_feed():
-    """Return update feed list."""
-    data = sentinel.slave.zrevrange(FEED_KEY, 0, 99, withscores=True)
+
+def _get_feed(key, limit):
+    data = sentinel.slave.zrevrange(key, 0, limit - 1, withscores=True)
     feed = []
-    for u in data:
-        tmp = pickle.loads(u[0])
-        tmp['updated'] = u[1]
-        if tmp.get('info') and type(tmp.get('info')) == unicode:
-            tmp['info'] = json.loads(tmp['info'])
+    for entry, updated in data:
+        tmp = json.loads(entry)
+        tmp['updated'] = updated
         feed.append(tmp)
     return feed
+
+
+@memoize(timeout=timeouts.get('FEED_TIMEOUT'))
+def get_update_feed(limit=100):
+    """Return update feed list."""
+    return _get_feed(FEED_KEY, limit)
+
+
+def get_project_feed(project_id, limit=30):
+    """Return the update feed list of a project."""
+    return _get_feed(PROJECT_FEED_KEY % project_id, limit)
+
+
+def delete_project_feed(project_id):
+    """Delete the update feed of a project."""
+    sentinel.master.delete(PROJECT_FEED_KEY % project_id)
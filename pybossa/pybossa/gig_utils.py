@@ -10,7 +10,7 @@ def json_traverse(obj, func):
     if type(obj) is list:
         for elt in obj:
             json_traverse(elt, func)
-    elif type(obj) is dict:
+    elif isinstance(obj, dict):
         for key, value in obj.iteritems():
             if func(obj, key, value):
                 json_traverse(value, func)
@@ -16,58 +16,57 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
 """Hateoas module for PyBossa."""
-from flask import url_for
+from flask import url_for, request
 
 
 class Hateoas(object):
 
-    """Hateoas class."""
+    """Hateoas class.
+
+    Links are built from the ids and foreign keys of the items, using a URL
+    template per domain object, so related objects are never loaded.
+    """
+
+    # Parent links of each domain object: (foreign key, title, rel)
+    parents = dict(taskrun=[('project_id', 'project', 'parent'),
+                            ('task_id', 'task', 'parent')],
+                   task=[('project_id', 'project', 'parent')],
+                   project=[('category_id', 'category', 'category')],
+                   category=[],
+                   user=[])
+
+    def __init__(self):
+        self._path_templates = {}
 
     def link(self, rel, title, href):
         """Return hateoas link."""
         return "<link rel='%s' title='%s' href='%s'/>" % (rel, title, href)
 
-    def create_link(self, item, rel='self'):
+    def url_template(self, title):
+        """Return the external URL of a domain object, with %s for its id."""
+        path = self._path_templates.get(title)
+        if path is None:
+            path = url_for(".api_%s" % title, oid=0)[:-1] + '%s'
+            self._path_templates[title] = path
+        # The host comes from the request, so only the path is cached
+        return request.host_url[:-1] + path
+
+    def create_link(self, oid, title, rel='self'):
         """Create hateoas link."""
-        title = item.__class__.__name__.lower()
-        method = ".api_%s" % title
-        href = url_for(method, oid=item.id, _external=True)
-        return self.link(rel, title, href)
+        return self.link(rel, title, self.url_template(title) % oid)
 
     def create_links(self, item):
         """Create Hateoas links."""
         cls = item.__class__.__name__.lower()
-        links = []
-        if cls == 'taskrun':
-            link = self.create_link(item)
-            try:
-                if item.project_id is not None:
-                    links.append(self.create_link(item.project, rel='parent'))
-                if item.task_id is not None:
-                    links.append(self.create_link(item.task, rel='parent'))
-            except:
-                links = None
-                pass
-            return links, link
-        elif cls == 'task':
-            link = self.create_link(item)
-            if item.project_id is not None:
-                links = [self.create_link(item.project, rel='parent')]
-            return links, link
-        elif cls == 'category':
-            return None, self.create_link(item)
-        elif cls == 'project':
-            link = self.create_link(item)
-            if item.category_id is not None:
-                links.append(self.create_link(item.category, rel='category'))
-            return links, link
-        elif cls == 'user':
-            link = self.create_link(item)
-            # TODO: add the projects created by the user as the
-            # links with rel=? (maybe 'project'??)
-            return None, link
-        else:  # pragma: no cover
+        if cls not in self.parents:  # pragma: no cover
             return False
+        link = self.create_link(item.id, cls)
+        links = [self.create_link(getattr(item, fk), title, rel=rel)
+                 for fk, title, rel in self.parents[cls]
+                 if getattr(item, fk) is not None]
+        # TODO: add the projects created by the user as the
+        # links with rel=? (maybe 'project'??)
+        return links or None, link
 
     def remove_links(self, item):
         """Remove HATEOAS link and links from item."""
@@ -0,0 +1,81 @@
+# -*- coding: utf8 -*-
+# This file is part of PyBossa.
+#
+# Copyright (C) 2015 SF Isle of Man Limited
+#
+# PyBossa is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyBossa is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
+"""Checkpoints of background task imports, stored in Redis.
+
+Each project has at most one import tracked at a time, in a hash holding
+its status, the number of source rows already committed and the number of
+tasks created so far."""
+import json
+from pybossa.core import sentinel
+
+
+IMPORT_KEY = 'pybossa:project:%s:import'
+IMPORT_KEY_TTL = 7 * 24 * 60 * 60
+
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+FAILED = 'failed'
+
+
+def start_import(project_id, form_data):
+    """Track a new import for a project, discarding any previous one."""
+    key = IMPORT_KEY % project_id
+    pipeline = sentinel.master.pipeline()
+    pipeline.delete(key)
+    pipeline.hmset(key, dict(status=QUEUED, rows=0, created=0, msg='',
+                             form_data=json.dumps(form_data)))
+    pipeline.expire(key, IMPORT_KEY_TTL)
+    pipeline.execute()
+
+
+def get_import(project_id):
+    """Return the tracked import of a project, or None."""
+    data = sentinel.master.hgetall(IMPORT_KEY % project_id)
+    if not data:
+        return None
+    return dict(status=data['status'],
+                rows=int(data['rows']),
+                created=int(data['created']),
+                msg=data['msg'].decode('utf-8'),
+                form_data=json.loads(data['form_data']))
+
+
+def get_checkpoint(project_id, form_data):
+    """Return (rows, created) to resume an import of form_data from."""
+    current = get_import(project_id)
+    if (current is None or current['status'] == FINISHED or
+            current['form_data'] != form_data):
+        return 0, 0
+    return current['rows'], current['created']
+
+
+def update_import(project_id, status, rows=None, created=None, msg=None):
+    """Record the status and, if given, the checkpoint of an import."""
+    key = IMPORT_KEY % project_id
+    mapping = dict(status=status)
+    if rows is not None:
+        mapping['rows'] = rows
+    if created is not None:
+        mapping['created'] = created
+    if msg is not None:
+        mapping['msg'] = msg
+    pipeline = sentinel.master.pipeline()
+    pipeline.hmset(key, mapping)
+    pipeline.expire(key, IMPORT_KEY_TTL)
+    pipeline.execute()
@@ -18,15 +18,51 @@
 """Importers module for PyBossa."""
 import string
 import json
+import codecs
+import itertools
 import requests
-from StringIO import StringIO
+from multiprocessing.pool import ThreadPool
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 from flask.ext.babel import gettext
 from pybossa.util import unicode_csv_reader
 from flask import request
-from werkzeug.datastructures import FileStorage
-import io
 import time
 
+
+# Parallel requests allowed when fetching paginated sources
+MAX_CONCURRENT_FETCHES = 4
+
+
+def _create_http_session():
+    """Return a keep-alive session that retries failed requests."""
+    retries = Retry(total=3, backoff_factor=0.5,
+                    status_forcelist=[500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=10,
+                          pool_maxsize=MAX_CONCURRENT_FETCHES,
+                          max_retries=retries)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+http_session = _create_http_session()
+
+
+def _http_get(url, **kwargs):
+    """GET url with the shared session.
+
+    Requests that fail for good, including those still answered with a 5xx
+    after the retries, raise a BulkImportException saying so."""
+    try:
+        return http_session.get(url, **kwargs)
+    except requests.exceptions.RequestException as e:
+        msg = gettext("Oops! We could not get %(url)s: %(error)s",
+                      url=url, error=e)
+        raise BulkImportException(msg, 'error')
+
+
 class BulkImportException(Exception):
 
     """Generic Bulk Importer Exception Error."""
@@ -44,21 +80,36 @@ class _BulkTaskImport(object):
         """Return a generator with all the tasks imported."""
         pass
 
-    def count_tasks(self, **form_data):
-        """Return amount of tasks to be imported."""
-        return len([task for task in self.tasks(**form_data)])
+    def count_tasks(self, limit=None, **form_data):
+        """Return amount of tasks to be imported, counting at most limit."""
+        tasks = itertools.islice(self.tasks(**form_data), limit)
+        return sum(1 for task in tasks)
+
+
+def _iter_lines(chunks):
+    """Yield lines, with their terminator, from an iterable of text chunks."""
+    pending = u''
+    for chunk in chunks:
+        lines = (pending + chunk).split(u'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + u'\n'
+    if pending:
+        yield pending
+
 
-        
 class _BulkTaskCSVImport(_BulkTaskImport):
 
     """Class to import CSV tasks in bulk."""
 
     importer_id = "csv"
 
+    chunk_size = 64 * 1024
+
     def tasks(self, **form_data):
         """Get tasks from a given URL."""
         dataurl = self._get_data_url(**form_data)
-        r = requests.get(dataurl)
+        r = _http_get(dataurl, stream=True)
         return self._get_csv_data_from_request(r)
 
     def _get_data_url(self, **form_data):
@@ -122,9 +173,8 @@ class _BulkTaskCSVImport(_BulkTaskImport):
             msg = gettext("Oops! That file doesn't look like the right file.")
             raise BulkImportException(msg, 'error')
 
-        r.encoding = 'utf-8'
-        csvcontent = StringIO(r.text)
-        csvreader = unicode_csv_reader(csvcontent)
+        chunks = codecs.iterdecode(r.iter_content(self.chunk_size), 'utf-8')
+        csvreader = unicode_csv_reader(_iter_lines(chunks))
         return self._import_csv_tasks(csvreader)
 
 class _BulkTaskLocalCSVImport(_BulkTaskCSVImport):
@@ -141,17 +191,17 @@ class _BulkTaskLocalCSVImport(_BulkTaskCSVImport):
         if csv_filename is None:
             msg = ("Not a valid csv file for import")
             raise BulkImportException(gettext(msg), 'error')
-        
+
         retry = 0
         csv_file = None
         while retry < 5:
             try:
-                csv_file = FileStorage(open(csv_filename, 'r'))
+                csv_file = open(csv_filename, 'rb')
                 break
             except IOError, e:
                 time.sleep(1)
                 retry += 1
- 
+
         if csv_file is None:
             if (('text/plain' not in request.headers['content-type']) and
                     ('text/csv' not in request.headers['content-type']) and
@@ -159,23 +209,31 @@ class _BulkTaskLocalCSVImport(_BulkTaskCSVImport):
                 msg = gettext("Oops! That file doesn't look like the right file.")
                 raise BulkImportException(msg, 'error')
 
-            request.encoding = 'utf-8'
-            csv_file = request.files['file']
-            if csv_file is None or file.stream is None:
+            upload = request.files.get('file')
+            if upload is None or upload.stream is None:
                 msg = ("Not a valid csv file for import")
-                raise BulkImportException(gettext(msg), 'error') 
-            
-        csv_file.stream.seek(0)
-        csvcontent = io.StringIO(csv_file.stream.read().decode("UTF8"))
-        csvreader = unicode_csv_reader(csvcontent)
-        return self._import_csv_tasks(csvreader)
-        
+                raise BulkImportException(gettext(msg), 'error')
+            csv_file = upload.stream
+            csv_file.seek(0)
+
+        return self._read_csv_file(csv_file)
+
+    def _read_csv_file(self, csv_file):
+        """Parse the file line by line, closing it once exhausted."""
+        try:
+            lines = codecs.iterdecode(csv_file, 'utf-8')
+            csvreader = unicode_csv_reader(lines)
+            for task_data in self._import_csv_tasks(csvreader):
+                yield task_data
+        finally:
+            csv_file.close()
+
     def tasks(self, **form_data):
-        """Get tasks from a given URL."""
+        """Get tasks from a local CSV file."""
         csv_filename = self._get_data(**form_data)
         return self._get_csv_data_from_request(csv_filename)
-                
-        
+
+
 class _BulkTaskGDImport(_BulkTaskCSVImport):
 
     """Class to import tasks from Google Drive in bulk."""
@@ -204,7 +262,7 @@ class _BulkTaskEpiCollectPlusImport(_BulkTaskImport):
     def tasks(self, **form_data):
         """Get tasks."""
         dataurl = self._get_data_url(**form_data)
-        r = requests.get(dataurl)
+        r = _http_get(dataurl)
         return self._get_epicollect_data_from_request(r)
 
     def _import_epicollect_tasks(self, data):
@@ -257,7 +315,7 @@ class _BulkTaskFlickrImport(_BulkTaskImport):
                    'photoset_id': album_id,
                    'format': 'json',
                    'nojsoncallback': '1'}
-        res = requests.get(url, params=payload)
+        res = _http_get(url, params=payload)
         if self._is_valid_response(res):
             content = json.loads(res.text)['photoset']
             total_pages = content.get('pages')
@@ -278,15 +336,23 @@ class _BulkTaskFlickrImport(_BulkTaskImport):
         return valid
 
     def _remaining_photos(self, url, payload, total_pages):
-        """Return the remainin photos."""
-        photo_lists = [self._photos_from_page(url, payload, page)
-                       for page in range(2, total_pages+1)]
+        """Return the remainin photos, fetching the pages concurrently."""
+        pages = range(2, total_pages+1)
+        if not pages:
+            return []
+        pool = ThreadPool(min(len(pages), MAX_CONCURRENT_FETCHES))
+        try:
+            photo_lists = pool.map(
+                lambda page: self._photos_from_page(url, payload, page), pages)
+        finally:
+            pool.close()
+            pool.join()
         return [item for sublist in photo_lists for item in sublist]
 
     def _photos_from_page(self, url, payload, page):
         """Return photos from page."""
-        payload['page'] = page
-        res = requests.get(url, params=payload)
+        payload = dict(payload, page=page)
+        res = _http_get(url, params=payload)
         if self._is_valid_response(res):
             return json.loads(res.text)['photoset']['photo']
         return []
@@ -384,6 +450,8 @@ class Importer(object):
 
     """Class to import data."""
 
+    chunk_size = 500
+
     def __init__(self):
         """Init method."""
         self._importers = {'csv': _BulkTaskCSVImport,
@@ -402,23 +470,36 @@ class Importer(object):
         self._importers['dropbox'] = _BulkTaskDropboxImport
 
     def create_tasks(self, task_repo, project_id, **form_data):
-        """Create tasks."""
-        from pybossa.model.task import Task
         """Create tasks from a remote source using an importer object and
         avoiding the creation of repeated tasks"""
-        importer_id = form_data.get('type')
-        empty = True
         n = 0
+        for n_rows, n in self.import_chunks(task_repo, project_id,
+                                            **form_data):
+            pass
+        return self.import_message(n)
+
+    def import_chunks(self, task_repo, project_id, skip=0, **form_data):
+        """Create tasks chunk by chunk, skipping the first skip rows.
+
+        Tasks are read from the source as a stream and saved in chunks of
+        chunk_size. After every committed chunk, yields the number of source
+        rows consumed (skipped ones included) and of tasks created so far."""
+        importer_id = form_data.get('type')
         importer = self._create_importer_for(importer_id)
-        for task_data in importer.tasks(**form_data):
-            task = Task(project_id=project_id)
-            [setattr(task, k, v) for k, v in task_data.iteritems()]
-            found = task_repo.get_task_by(project_id=project_id, info=task.info)
-            if found is None:
-                task_repo.save(task)
-                n += 1
-                empty = False
-        if empty:
+        tasks = itertools.islice(importer.tasks(**form_data), skip, None)
+        n_rows = skip
+        n = 0
+        while True:
+            chunk = list(itertools.islice(tasks, self.chunk_size))
+            if not chunk:
+                break
+            n_rows += len(chunk)
+            n += self._create_tasks_chunk(task_repo, project_id, chunk)
+            yield n_rows, n
+
+    def import_message(self, n):
+        """Return the message for an import that created n tasks."""
+        if n == 0:
             msg = gettext('It looks like there were no new records to import')
             return msg
         msg = str(n) + " " + gettext('new tasks were imported successfully')
@@ -426,10 +507,31 @@ class Importer(object):
             msg = str(n) + " " + gettext('new task was imported successfully')
         return msg
 
-    def count_tasks_to_import(self, **form_data):
-        """Count tasks to import."""
+    def _create_tasks_chunk(self, task_repo, project_id, chunk):
+        """Save the new tasks of a chunk and return how many were created."""
+        from pybossa.model import make_info_hash
+        from pybossa.model.task import Task
+        tasks = []
+        for task_data in chunk:
+            task = Task(project_id=project_id)
+            [setattr(task, k, v) for k, v in task_data.iteritems()]
+            task.info_hash = make_info_hash(task.info)
+            tasks.append(task)
+        seen = task_repo.get_existing_info_hashes(
+            project_id, [task.info_hash for task in tasks])
+        new_tasks = []
+        for task in tasks:
+            if task.info_hash not in seen:
+                seen.add(task.info_hash)
+                new_tasks.append(task)
+        task_repo.save_all(new_tasks)
+        return len(new_tasks)
+
+    def count_tasks_to_import(self, limit=None, **form_data):
+        """Count tasks to import, stopping once limit tasks are found."""
         importer_id = form_data.get('type')
-        return self._create_importer_for(importer_id).count_tasks(**form_data)
+        importer = self._create_importer_for(importer_id)
+        return importer.count_tasks(limit=limit, **form_data)
 
     def _create_importer_for(self, importer_id):
         """Create importer."""
@@ -17,7 +17,9 @@
 # along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
 """Jobs module for running background tasks in PyBossa server."""
 from datetime import datetime
+import json
 import math
+import time
 import requests
 from flask import current_app, render_template
 from flask.ext.mail import Message
@@ -28,6 +30,14 @@ import pybossa.dashboard.jobs as dashboard
 
 MINUTE = 60
 HOUR = 60 * 60
+# Time an import job runs before handing over to a new job
+IMPORT_TIME_BUDGET = 5 * MINUTE
+# Timeout of import jobs, leaving room to finish the chunk the budget ends in
+IMPORT_JOB_TIMEOUT = 10 * MINUTE
+# Timeout of the first refresh of the stats rollups, which reads every task run
+STATS_ROLLUPS_FULL_TIMEOUT = 4 * HOUR
+# Last task id scanned by backfill_task_info_hash
+TASK_INFO_HASH_LAST_ID_KEY = 'pybossa:jobs:backfill_task_info_hash:last_id'
 
 
 def schedule_job(function, scheduler):
@@ -102,8 +112,9 @@ def get_periodic_jobs(queue):
     non_contrib_jobs = get_non_contributors_users_jobs() \
         if queue == 'quaterly' else []
     dashboard_jobs = get_dashboard_jobs() if queue == 'low' else []
+    rollups_jobs = get_stats_rollups_jobs() if queue == 'low' else []
     _all = [zip_jobs, jobs, project_jobs, autoimport_jobs,
-            engage_jobs, non_contrib_jobs, dashboard_jobs]
+            engage_jobs, non_contrib_jobs, dashboard_jobs, rollups_jobs]
     return (job for sublist in _all for job in sublist if job['queue'] == queue)
 
 
@@ -115,6 +126,14 @@ def get_default_jobs():  # pragma: no cover
                timeout=(10 * MINUTE), queue='low')
     yield dict(name=warm_cache, args=[], kwargs={},
                timeout=(10 * MINUTE), queue='super')
+    yield dict(name=backfill_task_info_hash, args=[], kwargs={},
+               timeout=(10 * MINUTE), queue='low')
+    yield dict(name=reconcile_leaderboard, args=[], kwargs={},
+               timeout=(10 * MINUTE), queue='low')
+    yield dict(name=update_project_rank_scores, args=[], kwargs={},
+               timeout=(10 * MINUTE), queue='high')
+    yield dict(name=reconcile_contributions, args=[], kwargs={},
+               timeout=(10 * MINUTE), queue='low')
 
 
 def get_export_task_jobs(queue):
@@ -172,8 +191,8 @@ def get_inactive_users_jobs(queue='quaterly'):
     # First users that have participated once but more than 3 months ago
     sql = text('''SELECT user_id FROM task_run
                WHERE user_id IS NOT NULL
-               AND TO_DATE(task_run.finish_time, 'YYYY-MM-DD\THH24:MI:SS.US')
-               <= NOW() - '3 month'::INTERVAL GROUP BY task_run.user_id;''')
+               AND task_run.finish_time <= NOW() - '3 month'::INTERVAL
+               GROUP BY task_run.user_id;''')
     results = db.slave_session.execute(sql)
     for row in results:
 
@@ -221,6 +240,15 @@ def get_dashboard_jobs(queue='low'):  # pragma: no cover
                timeout=(10 * MINUTE), queue=queue)
 
 
+def get_stats_rollups_jobs(queue='low'):
+    """Return the job refreshing the stats rollups, with a longer timeout
+    if they were never refreshed, as it then aggregates every task run."""
+    import pybossa.stats_rollups as rollups
+    timeout = (10 * MINUTE) if rollups.ready() else STATS_ROLLUPS_FULL_TIMEOUT
+    yield dict(name=refresh_stats_rollups, args=[], kwargs={},
+               timeout=timeout, queue=queue)
+
+
 def get_non_contributors_users_jobs(queue='quaterly'):
     """Return a list of users that have never contributed to a project."""
     from sqlalchemy.sql import text
@@ -266,7 +294,7 @@ def get_autoimport_jobs(queue='low'):
             job = dict(name=import_tasks,
                        args=[project.id],
                        kwargs=project.get_autoimporter(),
-                       timeout=(10 * MINUTE),
+                       timeout=IMPORT_JOB_TIMEOUT,
                        queue=queue)
             yield job
 
@@ -321,7 +349,6 @@ def warm_cache():  # pragma: no cover
     import pybossa.cache.categories as cached_cat
     import pybossa.cache.users as cached_users
     import pybossa.cache.project_stats as stats
-    from pybossa.util import rank
 
     def warm_project(_id, short_name, featured=False):
         if _id not in projects_cached:
@@ -344,17 +371,19 @@ def warm_cache():  # pragma: no cover
         warm_project(p['id'], p['short_name'])
 
     # Cache 3 pages
-    to_cache = 3 * app.config['APPS_PER_PAGE']
-    projects = rank(cached_projects.get_all_featured('featured'))[:to_cache]
-    for p in projects:
-        warm_project(p['id'], p['short_name'], featured=True)
+    per_page = app.config['APPS_PER_PAGE']
+    for page in range(1, 4):
+        projects = cached_projects.get_featured('featured', page, per_page)
+        for p in projects:
+            warm_project(p['id'], p['short_name'], featured=True)
 
     # Categories
     categories = cached_cat.get_used()
     for c in categories:
-        projects = rank(cached_projects.get_all(c['short_name']))[:to_cache]
-        for p in projects:
-            warm_project(p['id'], p['short_name'])
+        for page in range(1, 4):
+            projects = cached_projects.get(c['short_name'], page, per_page)
+            for p in projects:
+                warm_project(p['id'], p['short_name'])
     # Users
     users = cached_users.get_leaderboard(app.config['LEADERBOARD'], 'anonymous')
     for user in users:
@@ -369,6 +398,30 @@ def warm_cache():  # pragma: no cover
     return True
 
 
+def refresh_stats_rollups(full=False):
+    """Background job to refresh the per project activity rollups."""
+    import pybossa.stats_rollups as rollups
+    return rollups.refresh(full=full)
+
+
+def reconcile_leaderboard():
+    """Background job to rebuild the leaderboard from the database."""
+    import pybossa.leaderboard as leaderboard
+    return leaderboard.reconcile()
+
+
+def reconcile_contributions():
+    """Background job to reload the per user contribution counters."""
+    import pybossa.contributions as contributions
+    return contributions.reconcile()
+
+
+def update_project_rank_scores():
+    """Background job to update the activity rank score of the projects."""
+    import pybossa.ranking as ranking
+    return ranking.update_rank_scores()
+
+
 def get_non_updated_projects():
     """Return a list of non updated projects."""
     from sqlalchemy.sql import text
@@ -416,12 +469,51 @@ def send_mail(message_dict):
     mail.send(message)
 
 
+def _import_time_budget(job):
+    """Return the time budget of an import job: IMPORT_TIME_BUDGET, but
+    never more than half of the job timeout."""
+    if job is None or not job.timeout or job.timeout < 0:
+        return IMPORT_TIME_BUDGET
+    return min(IMPORT_TIME_BUDGET, job.timeout / 2)
+
+
 def import_tasks(project_id, **form_data):
-    """Import tasks for a project."""
-    from pybossa.core import project_repo
+    """Import tasks for a project.
+
+    The import is checkpointed after every chunk of tasks. When the job runs
+    out of its time budget it enqueues itself again to carry on from the
+    checkpoint, and a failed import resumes from it when run again."""
+    from rq import get_current_job, Queue
+    from pybossa.core import project_repo, sentinel
+    import pybossa.import_progress as import_progress
     app = project_repo.get(project_id)
-    msg = importer.create_tasks(task_repo, project_id, **form_data)
+    skip, created = import_progress.get_checkpoint(project_id, form_data)
+    if skip == 0 and created == 0:
+        import_progress.start_import(project_id, form_data)
+    import_progress.update_import(project_id, import_progress.RUNNING)
+    deadline = time.time() + _import_time_budget(get_current_job())
+    n = 0
+    try:
+        for n_rows, n in importer.import_chunks(task_repo, project_id,
+                                                skip=skip, **form_data):
+            import_progress.update_import(project_id,
+                                          import_progress.RUNNING,
+                                          rows=n_rows, created=created + n)
+            job = get_current_job()
+            if job is not None and time.time() > deadline:
+                queue = Queue(job.origin, connection=sentinel.master)
+                queue.enqueue_call(func=import_tasks, args=[project_id],
+                                   kwargs=form_data, timeout=job.timeout)
+                return None
+    except Exception as e:
+        import_progress.update_import(project_id, import_progress.FAILED,
+                                      msg=unicode(e.args[0] if e.args
+                                                  else e))
+        raise
+    msg = importer.import_message(created + n)
     msg = msg + ' to your project %s!' % app.name
+    import_progress.update_import(project_id, import_progress.FINISHED,
+                                  msg=msg)
     subject = 'Tasks Import to your project %s' % app.name
     body = 'Hello,\n\n' + msg + '\n\nAll the best,\nThe %s team.'\
         % current_app.config.get('BRAND')
@@ -431,6 +523,37 @@ def import_tasks(project_id, **form_data):
     return msg
 
 
+def backfill_task_info_hash(batch_size=1000):
+    """Populate task.info_hash for tasks created before the column existed.
+
+    New tasks get their hash on insert, so the last task id scanned is kept
+    in Redis and the next run goes on from there."""
+    from sqlalchemy.sql import text
+    from pybossa.core import db, sentinel
+    from pybossa.model import make_info_hash
+    select_sql = text('''SELECT id, info FROM task
+                      WHERE info_hash IS NULL AND id > :last_id
+                      ORDER BY id LIMIT :limit''')
+    update_sql = text('''UPDATE task SET info_hash=:info_hash
+                      WHERE id=:id''')
+    last_id = int(sentinel.master.get(TASK_INFO_HASH_LAST_ID_KEY) or 0)
+    n_updated = 0
+    while True:
+        rows = db.session.execute(select_sql, dict(last_id=last_id,
+                                                   limit=batch_size)).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            info = json.loads(row.info) if row.info else {}
+            db.session.execute(update_sql,
+                               dict(id=row.id, info_hash=make_info_hash(info)))
+            n_updated += 1
+        db.session.commit()
+        last_id = rows[-1].id
+        sentinel.master.set(TASK_INFO_HASH_LAST_ID_KEY, last_id)
+    return n_updated
+
+
 def webhook(url, payload=None):
     """Post to a webhook."""
     import json
@@ -0,0 +1,113 @@
+# -*- coding: utf8 -*-
+# This file is part of PyBossa.
+#
+# Copyright (C) 2015 SF Isle of Man Limited
+#
+# PyBossa is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyBossa is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
+"""Global leaderboard of authenticated users, stored in a Redis sorted set.
+
+The score of a user is the number of task runs submitted. Scores are
+incremented as task runs are created and periodically reconciled with the
+database, which remains the source of truth. Until the leaderboard has been
+reconciled once, ranks are computed from the database instead."""
+from sqlalchemy import text
+from pybossa.core import db, sentinel
+
+
+LEADERBOARD_KEY = 'pybossa:leaderboard'
+# Set once the leaderboard holds every score, by its first reconciliation
+RECONCILED_KEY = 'pybossa:leaderboard:reconciled'
+RECONCILE_BATCH = 1000
+
+SCORES_SQL = '''WITH scores AS (
+                  SELECT user_id, COUNT(*) AS score FROM task_run
+                  WHERE user_id IS NOT NULL GROUP BY user_id)
+              SELECT user_id, score, rank() OVER (ORDER BY score DESC) AS rank
+              FROM scores'''
+
+
+def increment_score(user_id, amount=1):
+    """Add amount to the score of a user."""
+    sentinel.master.zincrby(LEADERBOARD_KEY, value=user_id, amount=amount)
+
+
+def reconcile():
+    """Set the leaderboard to the scores in the database, keeping the
+    increments made since they were read.
+
+    The scores are read from the primary first, then the leaderboard is
+    snapshot. The new leaderboard is database + current - snapshot, merged
+    with ZUNIONSTORE in one transaction, so no increment after the snapshot
+    is lost or counted twice."""
+    sql = text('''SELECT user_id, COUNT(*) AS score FROM task_run
+               WHERE user_id IS NOT NULL GROUP BY user_id;''')
+    results = db.session.execute(sql).fetchall()
+    snapshot_key = '%s:snapshot' % LEADERBOARD_KEY
+    scores_key = '%s:rebuild' % LEADERBOARD_KEY
+    pipeline = sentinel.master.pipeline()
+    pipeline.delete(scores_key)
+    pipeline.zunionstore(snapshot_key, [LEADERBOARD_KEY])
+    pipeline.execute()
+    for i in range(0, len(results), RECONCILE_BATCH):
+        for row in results[i:i + RECONCILE_BATCH]:
+            pipeline.zadd(scores_key, row.score, row.user_id)
+        pipeline.execute()
+    pipeline.zunionstore(LEADERBOARD_KEY, {scores_key: 1, LEADERBOARD_KEY: 1,
+                                           snapshot_key: -1})
+    # Users whose task runs were all deleted
+    pipeline.zremrangebyscore(LEADERBOARD_KEY, '-inf', 0)
+    pipeline.delete(scores_key, snapshot_key)
+    pipeline.set(RECONCILED_KEY, 1)
+    pipeline.execute()
+    return "Leaderboard reconciled with %s users" % len(results)
+
+
+def _reconciled():
+    return bool(sentinel.slave.exists(RECONCILED_KEY))
+
+
+def get_top(n):
+    """Return the top n users as (user_id, score, rank) tuples.
+
+    Users with the same score share the same rank."""
+    if not _reconciled():
+        sql = text(SCORES_SQL + ' ORDER BY rank LIMIT :limit;')
+        results = db.slave_session.execute(sql, dict(limit=n))
+        return [(row.user_id, row.score, row.rank) for row in results]
+    data = sentinel.slave.zrevrange(LEADERBOARD_KEY, 0, n - 1,
+                                    withscores=True)
+    top = []
+    rank = 0
+    previous = None
+    for position, (user_id, score) in enumerate(data, 1):
+        if score != previous:
+            rank = position
+            previous = score
+        top.append((int(user_id), int(score), rank))
+    return top
+
+
+def get_rank_and_score(user_id):
+    """Return the rank and score of a user, or None for both if unranked."""
+    if not _reconciled():
+        sql = text('SELECT * FROM (' + SCORES_SQL + ') AS global_rank '
+                   'WHERE user_id=:user_id;')
+        for row in db.slave_session.execute(sql, dict(user_id=user_id)):
+            return dict(rank=row.rank, score=row.score)
+        return dict(rank=None, score=None)
+    score = sentinel.slave.zscore(LEADERBOARD_KEY, user_id)
+    if score is None:
+        return dict(rank=None, score=None)
+    higher = sentinel.slave.zcount(LEADERBOARD_KEY, '(%s' % score, '+inf')
+    return dict(rank=higher + 1, score=int(score))
@@ -17,13 +17,14 @@
 # along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
+import hashlib
 import json
 import uuid
 
-from sqlalchemy import Text
+from sqlalchemy import Text, DateTime
 from sqlalchemy.orm import class_mapper
 from sqlalchemy.ext.mutable import Mutable
-from sqlalchemy.types import TypeDecorator
+from sqlalchemy.types import TypeDecorator, UserDefinedType
 
 import logging
 
@@ -59,6 +60,79 @@ class DomainObject(object):
         return repr
 
 
+class RawJSONDict(dict):
+    """A dict decoded from JSON that keeps the text it was decoded from in
+    raw_json, so it can be output again without encoding it.
+
+    raw_json is dropped as soon as the dict is modified, or a nested dict or
+    list is taken from it, as that one could then be modified. Nested values
+    shared through a copy made with dict() are not tracked."""
+
+    raw_json = None
+
+    def _modified(self):
+        self.raw_json = None
+
+    def _taken(self, value):
+        if isinstance(value, (dict, list)):
+            self.raw_json = None
+        return value
+
+    def __getitem__(self, key):
+        return self._taken(dict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        return self._taken(dict.get(self, key, default))
+
+    def copy(self):
+        self._modified()
+        return dict.copy(self)
+
+    def values(self):
+        self._modified()
+        return dict.values(self)
+
+    def itervalues(self):
+        self._modified()
+        return dict.itervalues(self)
+
+    def items(self):
+        self._modified()
+        return dict.items(self)
+
+    def iteritems(self):
+        self._modified()
+        return dict.iteritems(self)
+
+    def __setitem__(self, key, value):
+        self._modified()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._modified()
+        dict.__delitem__(self, key)
+
+    def clear(self):
+        self._modified()
+        dict.clear(self)
+
+    def pop(self, *args):
+        self._modified()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._modified()
+        return dict.popitem(self)
+
+    def setdefault(self, *args):
+        self._modified()
+        return dict.setdefault(self, *args)
+
+    def update(self, *args, **kwargs):
+        self._modified()
+        dict.update(self, *args, **kwargs)
+
+
 class JSONType(Mutable, TypeDecorator):
     '''Additional Database Type for handling JSON values.
     '''
@@ -71,12 +145,89 @@ class JSONType(Mutable, TypeDecorator):
         return json.dumps(value)
 
     def process_result_value(self, value, dialiect):
-        return json.loads(value)
+        decoded = json.loads(value)
+        if isinstance(decoded, dict):
+            decoded = RawJSONDict(decoded)
+            decoded.raw_json = value
+        return decoded
 
     def copy_value(self, value):
         return json.loads(json.dumps(value))
 
 
+class _JSONB(UserDefinedType):
+    """The Postgres jsonb type, bound and read as JSON text."""
+
+    def get_col_spec(self):
+        return 'JSONB'
+
+
+class JSONBType(JSONType):
+    """A JSONType stored as jsonb in Postgres, so it can be indexed and
+    queried by key.
+
+    Values are still exchanged with the database as JSON text (see
+    pybossa.core.setup_db), so they are decoded as for JSONType."""
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(_JSONB())
+        return dialect.type_descriptor(Text())
+
+    def process_result_value(self, value, dialect):
+        if value is not None and not isinstance(value, basestring):
+            # jsonb already decoded by the driver
+            return RawJSONDict(value) if isinstance(value, dict) else value
+        return super(JSONBType, self).process_result_value(value, dialect)
+
+
+def info_contains(key, value):
+    """Return the JSON documents an info column must contain for
+    info.<key>=value, where key may be a dotted path to a nested key.
+
+    The value is matched as a string and, if it is a JSON number, boolean or
+    null, also as that value."""
+    keys = key.split('.')
+    for k in keys:
+        if not k or not all(c.isalnum() or c in '_-' for c in k):
+            raise ValueError("Invalid info key: %s" % key)
+    values = [value]
+    try:
+        decoded = json.loads(value)
+        if decoded is None or isinstance(decoded, (bool, int, long, float)):
+            values.append(decoded)
+    except ValueError:
+        pass
+    documents = []
+    for v in values:
+        for k in reversed(keys):
+            v = {k: v}
+        documents.append(json.dumps(v))
+    return documents
+
+
+class UTCTimestamp(TypeDecorator):
+    """Represents a timestamp with time zone as a naive UTC ISO string.
+
+    Values are read back in the format of make_timestamp, so a column can be
+    switched from Text to a native timestamp without changing its output."""
+
+    impl = DateTime(timezone=True)
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, datetime.datetime):
+            value = iso_timestamp(value)
+        if value is not None:
+            time_part = value[10:]
+            if not ('Z' in time_part or '+' in time_part or
+                    '-' in time_part):
+                value += '+00:00'
+        return value
+
+    def process_result_value(self, value, dialect):
+        return iso_timestamp(value)
+
+
 class JSONEncodedDict(TypeDecorator):
     "Represents a dict structure as a json-encoded string."
 
@@ -136,10 +287,25 @@ def make_timestamp():
     return now.isoformat()
 
 
+def iso_timestamp(value):
+    """Return a datetime as a naive UTC ISO string, like make_timestamp."""
+    if isinstance(value, datetime.datetime):
+        if value.utcoffset() is not None:
+            value = (value - value.utcoffset()).replace(tzinfo=None)
+        return value.isoformat()
+    return value
+
+
 def make_uuid():
     return str(uuid.uuid4())
 
 
+def make_info_hash(info):
+    """Return a stable hash of the canonical JSON form of an info value."""
+    canonical = json.dumps(info, sort_keys=True, separators=(',', ':'))
+    return hashlib.md5(canonical.encode('utf-8')).hexdigest()
+
+
 def update_project_timestamp(mapper, conn, target):
     """Update method to be used by the relationship objects."""
     sql_query = ("update project set updated='%s' where id=%s" %
@@ -19,9 +19,12 @@ from datetime import datetime
 
 from rq import Queue
 from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
 
 from pybossa.feed import update_feed
-from pybossa.model import update_project_timestamp
+from pybossa.leaderboard import increment_score
+from pybossa.contributions import increment as increment_contributions
+from pybossa.model import update_project_timestamp, make_info_hash
 from pybossa.model.blogpost import Blogpost
 from pybossa.model.project import Project
 from pybossa.model.task import Task
@@ -79,6 +82,47 @@ def add_task_event(mapper, conn, target):
     update_feed(obj)
 
 
+@event.listens_for(Task, 'before_insert')
+def add_task_info_hash(mapper, conn, target):
+    """Set task.info_hash from task.info, unless the importer, which needs
+    it to filter out repeated tasks, has already set it."""
+    # The column default has not been applied yet: {} is what gets stored
+    if target.info is None:
+        target.info = {}
+    if target.info_hash is None:
+        target.info_hash = make_info_hash(target.info)
+
+
+@event.listens_for(Task, 'before_update')
+def update_task_info_hash(mapper, conn, target):
+    """Keep task.info_hash in sync with task.info when info changes."""
+    if get_history(target, 'info').has_changes():
+        target.info_hash = make_info_hash(target.info)
+
+
+@event.listens_for(Task, 'after_insert')
+def increment_project_n_tasks(mapper, conn, target):
+    """Keep project.n_tasks in sync when a task is created."""
+    sql_query = ('update project set n_tasks=n_tasks + 1 where id=%s'
+                 % target.project_id)
+    conn.execute(sql_query)
+
+
+@event.listens_for(Task, 'after_delete')
+def decrement_project_n_tasks(mapper, conn, target):
+    """Keep project.n_tasks in sync when a task is deleted."""
+    sql_query = ('update project set n_tasks=n_tasks - 1 where id=%s'
+                 % target.project_id)
+    conn.execute(sql_query)
+
+
+@event.listens_for(Project, 'before_insert')
+@event.listens_for(Project, 'before_update')
+def update_project_has_presenter(mapper, conn, target):
+    """Keep project.has_presenter in sync with project.info."""
+    target.has_presenter = 'task_presenter' in (target.info or {})
+
+
 @event.listens_for(User, 'after_insert')
 def add_user_event(mapper, conn, target):
     """Update PyBossa feed with new user."""
@@ -97,6 +141,7 @@ def add_user_contributed_to_feed(conn, user_id, project_obj):
                        name=r.name,
                        fullname=r.fullname,
                        info=r.info,
+                       project_id=project_obj['id'],
                        project_name=project_obj['name'],
                        project_short_name=project_obj['short_name'],
                        action_updated='UserContribution')
@@ -149,6 +194,10 @@ def on_taskrun_submit(mapper, conn, target):
         project_obj['id'] = target.project_id
 
     add_user_contributed_to_feed(conn, target.user_id, project_obj)
+    if target.user_id is not None:
+        increment_score(target.user_id)
+    increment_contributions(target.project_id, user_id=target.user_id,
+                            user_ip=target.user_ip)
     if is_task_completed(conn, target.task_id):
         update_task_state(conn, target.task_id)
         update_feed(project_obj)
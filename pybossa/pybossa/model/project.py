@@ -17,7 +17,8 @@
 # along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
 
 from sqlalchemy import Integer, Boolean, Unicode, Float, UnicodeText, Text
-from sqlalchemy.schema import Column, ForeignKey
+from sqlalchemy import text
+from sqlalchemy.schema import Column, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.ext.mutable import MutableDict
@@ -72,6 +73,12 @@ class Project(db.Model, DomainObject):
     category_id = Column(Integer, ForeignKey('category.id'), nullable=False)
     #: Project info field formatted as JSON
     info = Column(JSONEncodedDict, default=dict)
+    #: If the project info has a task_presenter (kept in sync on save)
+    has_presenter = Column(Boolean, nullable=False, default=False)
+    #: Number of tasks of the project (kept in sync on task insert/delete)
+    n_tasks = Column(Integer, nullable=False, default=0)
+    #: Activity rank score of the project (updated by a background job)
+    rank_score = Column(Integer, nullable=False, default=0)
 
     tasks = relationship(Task, cascade='all, delete, delete-orphan', backref='project')
     task_runs = relationship(TaskRun, backref='project',
@@ -80,6 +87,16 @@ class Project(db.Model, DomainObject):
     category = relationship(Category)
     blogposts = relationship(Blogpost, cascade='all, delete-orphan', backref='project')
 
+    __table_args__ = (
+        Index('project_published_rank_idx', category_id,
+              rank_score.desc(), name,
+              postgresql_where=text('hidden=0 AND has_presenter '
+                                    'AND n_tasks > 0')),
+        Index('project_draft_idx', 'id',
+              postgresql_where=text('hidden=0 AND NOT has_presenter '
+                                    'AND n_tasks = 0')),
+    )
+
     def needs_password(self):
         return self.get_passwd_hash() is not None
 
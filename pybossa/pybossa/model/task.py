@@ -17,11 +17,11 @@
 # along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
 
 from sqlalchemy import Integer, Boolean, Float, UnicodeText, Text
-from sqlalchemy.schema import Column, ForeignKey
+from sqlalchemy.schema import Column, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 
 from pybossa.core import db
-from pybossa.model import DomainObject, JSONType, JSONEncodedDict, \
+from pybossa.model import DomainObject, JSONBType, JSONEncodedDict, \
     make_timestamp
 from pybossa.model.task_run import TaskRun
 
@@ -31,7 +31,10 @@ class Task(db.Model, DomainObject):
     associated to a project.
     '''
     __tablename__ = 'task'
-
+    __table_args__ = (Index('task_project_id_info_hash_idx', 'project_id',
+                            'info_hash'),
+                      Index('task_info_idx', 'info', postgresql_using='gin',
+                            postgresql_ops={'info': 'jsonb_path_ops'}))
 
     #: Task.ID
     id = Column(Integer, primary_key=True)
@@ -47,7 +50,9 @@ class Task(db.Model, DomainObject):
     #: Priority of the task from 0.0 to 1.0
     priority_0 = Column(Float, default=0)
     #: Task.info field in JSON with the data for the task.
-    info = Column(JSONType, default=dict)
+    info = Column(JSONBType, default=dict)
+    #: MD5 of the canonical JSON of Task.info, used to detect duplicates.
+    info_hash = Column(Text)
     #: Number of answers to collect for this task.
     n_answers = Column(Integer, default=30)
     #: completed task can be marked as exported=True after its exported
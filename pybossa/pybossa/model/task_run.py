@@ -17,10 +17,11 @@
 # along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
 
 from sqlalchemy import Integer, Text
-from sqlalchemy.schema import Column, ForeignKey
+from sqlalchemy.schema import Column, ForeignKey, Index
 
 from pybossa.core import db
-from pybossa.model import DomainObject, JSONType, make_timestamp
+from pybossa.model import DomainObject, JSONBType, UTCTimestamp, \
+    make_timestamp
 
 
 
@@ -28,11 +29,19 @@ class TaskRun(db.Model, DomainObject):
     '''A run of a given task by a specific user.
     '''
     __tablename__ = 'task_run'
+    __table_args__ = (Index('task_run_project_id_finish_time_idx',
+                            'project_id', 'finish_time'),
+                      Index('task_run_user_id_finish_time_idx',
+                            'user_id', 'finish_time'),
+                      Index('task_run_finish_time_idx', 'finish_time'),
+                      Index('task_run_info_idx', 'info',
+                            postgresql_using='gin',
+                            postgresql_ops={'info': 'jsonb_path_ops'}))
 
     #: ID of the TaskRun
     id = Column(Integer, primary_key=True)
     #: UTC timestamp for when TaskRun is created.
-    created = Column(Text, default=make_timestamp)
+    created = Column(UTCTimestamp, default=make_timestamp)
     #: Project.id of the project associated with this TaskRun.
     project_id = Column(Integer, ForeignKey('project.id'), nullable=False)
     #: Task.id of the task associated with this TaskRun.
@@ -42,11 +51,12 @@ class TaskRun(db.Model, DomainObject):
     user_id = Column(Integer, ForeignKey('user.id'))
     #: User.ip of the user contributing the TaskRun (only if anonymous)
     user_ip = Column(Text)
-    finish_time = Column(Text, default=make_timestamp)
+    #: UTC timestamp for when the TaskRun is submitted.
+    finish_time = Column(UTCTimestamp, default=make_timestamp)
     timeout = Column(Integer)
     calibration = Column(Integer)
     #: Value of the answer.
-    info = Column(JSONType, default=dict)
+    info = Column(JSONBType, default=dict)
     '''General writable field that should be used by clients to record results\
     of a TaskRun. Usually a template for this will be provided by Task
     For example::
@@ -0,0 +1,92 @@
+# -*- coding: utf8 -*-
+# This file is part of PyBossa.
+#
+# Copyright (C) 2015 SF Isle of Man Limited
+#
+# PyBossa is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyBossa is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
+"""Activity ranking of projects, computed in the database.
+
+Unfinished projects, non test projects and projects with a thumbnail get a
+bonus, and the number of tasks, the number of volunteers and how recently the
+project was active add points by interval. Scores are stored in
+project.rank_score by a background job, so ranked listings are read in order
+from an index."""
+from sqlalchemy import text
+from pybossa.core import db
+
+
+def _points_by_interval(value, weight=1):
+    """Return the SQL of the points earned by a value, by interval."""
+    return '''(CASE WHEN %(value)s > 100 THEN %(p20)s
+                    WHEN %(value)s > 50 THEN %(p15)s
+                    WHEN %(value)s > 20 THEN %(p10)s
+                    WHEN %(value)s > 10 THEN %(p5)s
+                    WHEN %(value)s > 0 THEN %(p1)s
+                    ELSE 0 END)''' % dict(value=value, p20=20 * weight,
+                                          p15=15 * weight, p10=10 * weight,
+                                          p5=5 * weight, p1=weight)
+
+
+RANK_SCORE_SQL = '''
+    WITH volunteers AS (
+         SELECT project_id,
+         COUNT(DISTINCT user_id) FILTER (WHERE user_ip IS NULL) +
+         COUNT(DISTINCT user_ip) FILTER (WHERE user_id IS NULL)
+            AS n_volunteers,
+         MAX(finish_time) AT TIME ZONE 'UTC' AS last_activity
+         FROM task_run GROUP BY project_id),
+    completed AS (
+         SELECT project_id, COUNT(*) AS n_completed FROM task
+         WHERE state='completed' GROUP BY project_id),
+    stats AS (
+         SELECT project.id,
+         project.n_tasks,
+         COALESCE(completed.n_completed, 0) AS n_completed,
+         COALESCE(volunteers.n_volunteers, 0) AS n_volunteers,
+         (LOWER(project.name) LIKE '%%test%%' OR
+          LOWER(project.short_name) LIKE '%%test%%') AS is_test,
+         COALESCE(CAST(project.info AS JSON)->>'thumbnail', '') != ''
+            AS has_thumbnail,
+         EXTRACT(DAY FROM (NOW() AT TIME ZONE 'UTC') -
+                 GREATEST(CAST(project.updated AS TIMESTAMP),
+                          volunteers.last_activity)) AS days_inactive
+         FROM project
+         LEFT JOIN completed ON completed.project_id=project.id
+         LEFT JOIN volunteers ON volunteers.project_id=project.id),
+    scores AS (
+         SELECT id,
+         (CASE WHEN COALESCE(n_completed * 100 / NULLIF(n_tasks, 0), 0)
+                    != 100 THEN 1000 ELSE 0 END) +
+         (CASE WHEN is_test THEN 0 ELSE 500 END) +
+         (CASE WHEN has_thumbnail THEN 200 ELSE 0 END) +
+         %(tasks_points)s +
+         %(volunteers_points)s +
+         (CASE WHEN days_inactive < 1 THEN 50
+               WHEN days_inactive < 2 THEN 20
+               WHEN days_inactive < 3 THEN 10
+               WHEN days_inactive < 4 THEN 5
+               ELSE 0 END) AS rank_score
+         FROM stats)
+    UPDATE project SET rank_score=scores.rank_score FROM scores
+    WHERE project.id=scores.id
+    AND project.rank_score != scores.rank_score;
+    ''' % dict(tasks_points=_points_by_interval('n_tasks'),
+               volunteers_points=_points_by_interval('n_volunteers', weight=2))
+
+
+def update_rank_scores():
+    """Recompute the rank score of every project."""
+    result = db.session.execute(text(RANK_SCORE_SQL))
+    db.session.commit()
+    return "%s project rank scores updated" % result.rowcount
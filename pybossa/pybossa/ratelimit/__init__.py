@@ -24,14 +24,51 @@ This module exports:
     * ratelimit decorator: for decorating the views
 
 """
+import logging
+import threading
 import time
 from functools import update_wrapper, wraps
 from flask import request, g
+from flask.ext.login import current_user
+from redis.exceptions import RedisError
 from werkzeug.exceptions import TooManyRequests
-from pybossa.core import sentinel
+from pybossa.core import sentinel, ratelimits
 from pybossa.error import ErrorStatus
 
 error = ErrorStatus()
+log = logging.getLogger(__name__)
+
+# Sliding window counter: the previous window counts in proportion to the
+# part of it still covered by a window ending now. The hits are only added
+# when they fit, so rejected requests do not extend a ban.
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local weight = tonumber(ARGV[2])
+local hits = tonumber(ARGV[3])
+local expire_at = tonumber(ARGV[4])
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local used = math.floor(previous * weight) + current
+if used + hits > limit then
+    return {0, used}
+end
+redis.call('INCRBY', KEYS[1], hits)
+redis.call('EXPIREAT', KEYS[1], expire_at)
+return {1, used + hits}
+"""
+
+_sliding_window = None
+_local = threading.local()
+# Until when Redis is skipped after it failed (epoch seconds)
+_redis_down_until = [0]
+MAX_PENDING_KEYS = 1000
+
+
+def _sliding_window_script():
+    global _sliding_window
+    if _sliding_window is None:
+        _sliding_window = sentinel.master.register_script(SLIDING_WINDOW_LUA)
+    return _sliding_window
 
 
 class RateLimit(object):
@@ -39,28 +76,65 @@ class RateLimit(object):
     """
     Limit the number of requests.
 
-    It uses a Redis pipe from the master node (configured via Sentinel) to
-    limit the number of requests.
+    It runs an atomic sliding window Lua script on the master node
+    (configured via Sentinel), in a single round trip. Callers that are
+    clearly under the limit can batch their hits locally, and if Redis fails
+    requests are let through for a while instead of erroring.
 
     """
 
     expiration_window = 10
 
     def __init__(self, key_prefix, limit, per, send_x_headers):
-        self.reset = (int(time.time()) // per) * per + per
+        now = time.time()
+        window = int(now) // per
+        self.reset = window * per + per
         self.key = key_prefix + str(self.reset)
+        self.previous_key = key_prefix + str(self.reset - per)
         self.limit = limit
         self.per = per
         self.send_x_headers = send_x_headers
-
-        p = sentinel.master.pipeline()
-        p.incr(self.key)
-        p.expireat(self.key, self.reset + self.expiration_window)
-
-        self.current = min(p.execute()[0], limit)
-
-    remaining = property(lambda x: x.limit - x.current)
-    over_limit = property(lambda x: x.current >= x.limit)
+        self.weight = (self.reset - now) / float(per)
+        self.allowed, self.current = self._hit()
+
+    remaining = property(lambda x: max(x.limit - x.current, 0))
+    over_limit = property(lambda x: not x.allowed)
+
+    def _hit(self):
+        batch = ratelimits.get('LOCAL_BATCH') or 0
+        pending = _pending_hits()
+        known = pending.get(self.key)
+        # Under half of the limit, up to batch hits are counted locally and
+        # sent with the next request that goes to Redis
+        if (batch and known and known['hits'] < batch and
+                known['used'] + known['hits'] < self.limit // 2):
+            known['hits'] += 1
+            return True, known['used'] + known['hits']
+        hits = 1 + (known['hits'] if known else 0)
+        pending.pop(self.key, None)
+        if time.time() < _redis_down_until[0]:
+            return True, 0
+        try:
+            allowed, used = _sliding_window_script()(
+                keys=[self.key, self.previous_key],
+                args=[self.limit, self.weight, hits,
+                      self.reset + self.per + self.expiration_window])
+        except RedisError as e:
+            backoff = ratelimits.get('REDIS_BACKOFF') or 0
+            _redis_down_until[0] = time.time() + backoff
+            log.warning('Rate limit disabled for %ss: %s' % (backoff, e))
+            return True, 0
+        if allowed and batch:
+            if len(pending) >= MAX_PENDING_KEYS:
+                pending.clear()
+            pending[self.key] = dict(used=used, hits=0)
+        return bool(allowed), used
+
+
+def _pending_hits():
+    if not hasattr(_local, 'pending'):
+        _local.pending = {}
+    return _local.pending
 
 
 def get_view_rate_limit():
@@ -68,8 +142,16 @@ def get_view_rate_limit():
     return getattr(g, '_view_rate_limit', None)
 
 
+def default_scope():
+    """Return the scope of the current request: the user of its API key or
+    session if any, otherwise its remote address."""
+    if current_user.is_authenticated():
+        return 'user:%s' % current_user.id
+    return request.remote_addr
+
+
 def ratelimit(limit, per, send_x_headers=True,
-              scope_func=lambda: request.remote_addr,
+              scope_func=default_scope,
               key_func=lambda: request.endpoint,
               path=lambda: request.path):
     """
@@ -17,11 +17,14 @@
 # along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
 
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
 
 from pybossa.model.project import Project
 from pybossa.model.category import Category
 from pybossa.exc import WrongObjectError, DBIntegrityError
 from pybossa.cache import projects as cached_projects
+from pybossa import contributions
+from pybossa.feed import delete_project_feed
 from pybossa.core import uploader
 
 
@@ -43,9 +46,19 @@ class ProjectRepository(object):
     def get_all(self):
         return self.db.session.query(Project).all()
 
-    def filter_by(self, limit=None, offset=0, **filters):
+    def get_version(self, id):
+        """Return the (updated, rank_score, n_tasks, has_presenter) columns
+        of a project without loading the whole row, or None if it does not
+        exist."""
+        query = self.db.session.query(Project.updated, Project.rank_score,
+                                      Project.n_tasks, Project.has_presenter)
+        return query.filter_by(id=id).first()
+
+    def filter_by(self, limit=None, offset=0, fields=None, **filters):
         query = self.db.session.query(Project).filter_by(**filters)
         query = query.order_by(Project.id).limit(limit).offset(offset)
+        if fields:
+            query = query.options(load_only(*fields))
         return query.all()
 
     def save(self, project):
@@ -77,6 +90,8 @@ class ProjectRepository(object):
         self.db.session.commit()
         cached_projects.delete_project(project.short_name)
         cached_projects.clean(project.id)
+        contributions.forget(project.id)
+        delete_project_feed(project.id)
         self._delete_zip_files_from_store(project)
 
 
@@ -86,15 +101,24 @@ class ProjectRepository(object):
             return self.db.session.query(Category).first()
         return self.db.session.query(Category).get(id)
 
+    def get_category_version(self, id):
+        """Return the (name, short_name, description) columns of a category,
+        or None if it does not exist."""
+        query = self.db.session.query(Category.name, Category.short_name,
+                                      Category.description)
+        return query.filter_by(id=id).first()
+
     def get_category_by(self, **attributes):
         return self.db.session.query(Category).filter_by(**attributes).first()
 
     def get_all_categories(self):
         return self.db.session.query(Category).all()
 
-    def filter_categories_by(self, limit=None, offset=0, **filters):
+    def filter_categories_by(self, limit=None, offset=0, fields=None, **filters):
         query = self.db.session.query(Category).filter_by(**filters)
         query = query.order_by(Category.id).limit(limit).offset(offset)
+        if fields:
+            query = query.options(load_only(*fields))
         return query.all()
 
     def save_category(self, category):
@@ -18,11 +18,14 @@
 
 from sqlalchemy.sql import text
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
 
 from pybossa.model.task import Task
 from pybossa.model.task_run import TaskRun
+from pybossa.model import info_contains
 from pybossa.exc import WrongObjectError, DBIntegrityError
 from pybossa.cache import projects as cached_projects
+from pybossa import contributions
 from pybossa.core import uploader
 
 
@@ -35,12 +38,26 @@ class TaskRepository(object):
     def get_task(self, id):
         return self.db.session.query(Task).get(id)
 
+    def get_version(self, id):
+        """Return the columns of a task that can change, with info_hash in
+        place of info, without loading the whole row, or None if it does not
+        exist."""
+        query = self.db.session.query(Task.state, Task.quorum,
+                                      Task.calibration, Task.priority_0,
+                                      Task.n_answers, Task.exported,
+                                      Task.info_hash)
+        return query.filter_by(id=id).first()
+
     def get_task_by(self, **attributes):
         return self.db.session.query(Task).filter_by(**attributes).first()
 
-    def filter_tasks_by(self, limit=None, offset=0, yielded=False, **filters):
-        query = self.db.session.query(Task).filter_by(**filters)
+    def filter_tasks_by(self, limit=None, offset=0, yielded=False,
+                        fields=None, **filters):
+        query = self._filter_by_info(self.db.session.query(Task), Task, filters)
+        query = query.filter_by(**filters)
         query = query.order_by(Task.id).limit(limit).offset(offset)
+        if fields:
+            query = query.options(load_only(*fields))
         if yielded:
             return query.yield_per(1)
         return query.all()
@@ -48,6 +65,14 @@ class TaskRepository(object):
     def count_tasks_with(self, **filters):
         return self.db.session.query(Task).filter_by(**filters).count()
 
+    def get_existing_info_hashes(self, project_id, info_hashes):
+        """Return the subset of info_hashes already used by project tasks."""
+        if not info_hashes:
+            return set()
+        query = self.db.session.query(Task.info_hash).filter(
+            Task.project_id == project_id, Task.info_hash.in_(info_hashes))
+        return set(row.info_hash for row in query)
+
 
     # Methods for queries on TaskRun objects
     def get_task_run(self, id):
@@ -56,9 +81,14 @@ class TaskRepository(object):
     def get_task_run_by(self, **attributes):
         return self.db.session.query(TaskRun).filter_by(**attributes).first()
 
-    def filter_task_runs_by(self, limit=None, offset=0, yielded=False, **filters):
-        query = self.db.session.query(TaskRun).filter_by(**filters)
+    def filter_task_runs_by(self, limit=None, offset=0, yielded=False,
+                            fields=None, **filters):
+        query = self._filter_by_info(self.db.session.query(TaskRun), TaskRun,
+                                     filters)
+        query = query.filter_by(**filters)
         query = query.order_by(TaskRun.id).limit(limit).offset(offset)
+        if fields:
+            query = query.options(load_only(*fields))
         if yielded:
             return query.yield_per(1)
         return query.all()
@@ -103,6 +133,19 @@ class TaskRepository(object):
             self.db.session.rollback()
             raise DBIntegrityError(e)
 
+    def save_all(self, elements):
+        if not elements:
+            return
+        for element in elements:
+            self._validate_can_be('saved', element)
+        try:
+            self.db.session.add_all(elements)
+            self.db.session.commit()
+            cached_projects.clean_project(elements[0].project_id)
+        except IntegrityError as e:
+            self.db.session.rollback()
+            raise DBIntegrityError(e)
+
     def update(self, element):
         self._validate_can_be('updated', element)
         try:
@@ -118,6 +161,7 @@ class TaskRepository(object):
         project = element.project
         self.db.session.commit()
         cached_projects.clean_project(element.project_id)
+        contributions.forget(element.project_id)
         self._delete_zip_files_from_store(project)
 
     def delete_all(self, elements):
@@ -131,6 +175,7 @@ class TaskRepository(object):
         project = elements[0].project
         self.db.session.commit()
         cached_projects.clean_project(element.project_id)
+        contributions.forget(element.project_id)
         self._delete_zip_files_from_store(project)
 
     def update_tasks_redundancy(self, project, n_answer):
@@ -163,6 +208,24 @@ class TaskRepository(object):
             msg = '%s cannot be %s by %s' % (name, action, self.__class__.__name__)
             raise WrongObjectError(msg)
 
+    def _filter_by_info(self, query, model, filters):
+        """Filter query on the info.<key>=value items of filters, removing
+        them from filters. Each one is a jsonb containment test, answered by
+        the GIN index on info."""
+        params = {}
+        for key in [k for k in filters.keys() if k.startswith('info.')]:
+            clauses = []
+            for document in info_contains(key[len('info.'):],
+                                          filters.pop(key)):
+                name = 'info_%s' % len(params)
+                params[name] = document
+                clauses.append('%s.info @> CAST(:%s AS JSONB)'
+                               % (model.__tablename__, name))
+            query = query.filter(text('(%s)' % ' OR '.join(clauses)))
+        if params:
+            query = query.params(**params)
+        return query
+
     def _delete(self, element):
         self._validate_can_be('deleted', element)
         table = element.__class__
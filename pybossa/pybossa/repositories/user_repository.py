@@ -18,6 +18,7 @@
 
 from sqlalchemy import or_, func
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
 
 from pybossa.model.user import User
 from pybossa.exc import WrongObjectError, DBIntegrityError
@@ -40,9 +41,11 @@ class UserRepository(object):
     def get_all(self):
         return self.db.session.query(User).all()
 
-    def filter_by(self, limit=None, offset=0, **filters):
+    def filter_by(self, limit=None, offset=0, fields=None, **filters):
         query = self.db.session.query(User).filter_by(**filters)
         query = query.order_by(User.id).limit(limit).offset(offset)
+        if fields:
+            query = query.options(load_only(*fields))
         return query.all()
 
     def search_by_name(self, keyword):
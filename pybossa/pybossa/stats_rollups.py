@@ -0,0 +1,127 @@
+# -*- coding: utf8 -*-
+# This file is part of PyBossa.
+#
+# Copyright (C) 2015 SF Isle of Man Limited
+#
+# PyBossa is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyBossa is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
+"""Per project activity rollups, aggregated by UTC hour and by UTC day.
+
+Each rollup row holds, for a project and a time bucket, the number of
+answers (all, anonymous and authenticated), of distinct contributors and of
+tasks completed. The rollups are refreshed incrementally by a background job
+that only aggregates the task runs of the buckets since the last refresh."""
+from datetime import datetime
+from sqlalchemy import text
+from pybossa.core import db
+
+
+ROLLUPS = [dict(table='project_stats_hour', bucket='hour', unit='hour',
+                type='TIMESTAMP'),
+           dict(table='project_stats_day', bucket='day', unit='day',
+                type='DATE')]
+
+CREATE_SQL = '''CREATE TABLE IF NOT EXISTS %(table)s (
+                project_id INTEGER NOT NULL
+                    REFERENCES project(id) ON DELETE CASCADE,
+                %(bucket)s %(type)s NOT NULL,
+                n_answers INTEGER NOT NULL DEFAULT 0,
+                n_anon_answers INTEGER NOT NULL DEFAULT 0,
+                n_auth_answers INTEGER NOT NULL DEFAULT 0,
+                n_contributors INTEGER NOT NULL DEFAULT 0,
+                n_completed_tasks INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (project_id, %(bucket)s));'''
+
+DELETE_SQL = '''DELETE FROM %(table)s WHERE %(bucket)s >= :start;'''
+
+ANSWERS_SQL = '''INSERT INTO %(table)s (project_id, %(bucket)s, n_answers,
+                 n_anon_answers, n_auth_answers, n_contributors)
+                 SELECT project_id,
+                 CAST(DATE_TRUNC('%(unit)s', finish_time AT TIME ZONE 'UTC')
+                      AS %(type)s) AS bucket,
+                 COUNT(*),
+                 COUNT(*) FILTER (WHERE user_id IS NULL),
+                 COUNT(*) FILTER (WHERE user_ip IS NULL),
+                 COUNT(DISTINCT COALESCE(CAST(user_id AS TEXT), user_ip))
+                 FROM task_run
+                 WHERE finish_time >= CAST(:start AS TIMESTAMP)
+                                      AT TIME ZONE 'UTC'
+                 GROUP BY project_id, bucket;'''
+
+# A task is completed by the task run that reaches its n_answers
+COMPLETED_SQL = '''UPDATE %(table)s SET n_completed_tasks=completed.n_tasks
+                   FROM (SELECT ranked.project_id,
+                         CAST(DATE_TRUNC('%(unit)s',
+                              ranked.finish_time AT TIME ZONE 'UTC')
+                              AS %(type)s) AS bucket,
+                         COUNT(*) AS n_tasks
+                         FROM (SELECT task_id, project_id, finish_time,
+                               ROW_NUMBER() OVER (PARTITION BY task_id
+                                   ORDER BY finish_time, id) AS nth
+                               FROM task_run WHERE task_id IN (
+                                   SELECT task_id FROM task_run
+                                   WHERE finish_time >=
+                                   CAST(:start AS TIMESTAMP)
+                                   AT TIME ZONE 'UTC')) AS ranked
+                         JOIN task ON task.id=ranked.task_id
+                         WHERE ranked.nth=task.n_answers
+                         AND ranked.finish_time >= CAST(:start AS TIMESTAMP)
+                                                   AT TIME ZONE 'UTC'
+                         GROUP BY ranked.project_id, bucket) AS completed
+                   WHERE %(table)s.project_id=completed.project_id
+                   AND %(table)s.%(bucket)s=completed.bucket;'''
+
+
+def create_tables():
+    """Create the rollup tables if they do not exist yet."""
+    for rollup in ROLLUPS:
+        db.session.execute(text(CREATE_SQL % rollup))
+    db.session.commit()
+
+
+def ready(session=None):
+    """Return whether the rollups exist and have been refreshed, so they can
+    be read. A refresh is committed at once, so any row means it is done."""
+    session = session or db.session
+    sql = text('''SELECT to_regclass('project_stats_day') IS NOT NULL
+               AS created;''')
+    if not session.execute(sql).scalar():
+        return False
+    sql = text('''SELECT EXISTS (SELECT 1 FROM project_stats_day)
+               AS refreshed;''')
+    return session.execute(sql).scalar()
+
+
+def _last_refreshed_day():
+    sql = text('''SELECT MAX(day) AS day FROM project_stats_day;''')
+    for row in db.session.execute(sql):
+        return row.day
+    return None
+
+
+def refresh(full=False):
+    """Aggregate the task runs since the last refreshed day.
+
+    The last refreshed day is aggregated again, as it may have been partial.
+    With full, all the rollups are rebuilt from scratch."""
+    create_tables()
+    start = None if full else _last_refreshed_day()
+    if start is None:
+        start = datetime(1970, 1, 1)
+    params = dict(start=start)
+    for rollup in ROLLUPS:
+        db.session.execute(text(DELETE_SQL % rollup), params)
+        db.session.execute(text(ANSWERS_SQL % rollup), params)
+        db.session.execute(text(COMPLETED_SQL % rollup), params)
+    db.session.commit()
+    return "Rollups refreshed from %s" % start
@@ -0,0 +1,125 @@
+# -*- coding: utf8 -*-
+# This file is part of PyBossa.
+#
+# Copyright (C) 2015 SF Isle of Man Limited
+#
+# PyBossa is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# PyBossa is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with PyBossa.  If not, see <http://www.gnu.org/licenses/>.
+"""Tasks requested by and presented to each user, stored in Redis.
+
+Every user (by id, or by IP address if anonymous) has one hash with a
+requested:<task_id> field for each task it was given and a
+presented:<task_id> field with the time a task was first shown to it. Each
+value starts with the epoch second it was set at, so entries expire one by
+one although Redis can only expire the whole hash. A sorted set scores each
+field by that same second, so expired fields can be found and dropped
+without reading the whole hash."""
+import time
+from pybossa.core import sentinel
+
+
+TASKS_KEY = 'pybossa:user:%s:tasks'
+SET_AT_KEY = 'pybossa:user:%s:tasks:set_at'
+# Coincides with the inactivity timeout
+TIMEOUT = 60 * 60
+# At most this many expired entries are dropped on each write, which is
+# more than the one entry a write adds, so a hash cannot keep growing
+PRUNE_BATCH = 10
+
+_FRESH_LUA = """
+local now = tonumber(ARGV[1])
+local timeout = tonumber(ARGV[2])
+local function fresh(value)
+    return value and now - tonumber(string.match(value, '^%d+')) <= timeout
+end
+"""
+
+# KEYS: hash, sorted set
+# ARGV: now, timeout, field, value, only if not set (0/1), prune batch
+SET_LUA = _FRESH_LUA + """
+local key, set_at = KEYS[1], KEYS[2]
+if ARGV[5] == '1' and fresh(redis.call('HGET', key, ARGV[3])) then
+    return 0
+end
+redis.call('HSET', key, ARGV[3], ARGV[1] .. ' ' .. ARGV[4])
+redis.call('ZADD', set_at, now, ARGV[3])
+local expired = redis.call('ZRANGEBYSCORE', set_at, '-inf',
+                           '(' .. (now - timeout), 'LIMIT', 0, ARGV[6])
+if #expired > 0 then
+    redis.call('HDEL', key, unpack(expired))
+    redis.call('ZREM', set_at, unpack(expired))
+end
+redis.call('EXPIRE', key, timeout)
+redis.call('EXPIRE', set_at, timeout)
+return 1
+"""
+
+# KEYS: hash, sorted set
+# ARGV: now, timeout, requested field, presented field, consume request (0/1)
+CONSUME_LUA = _FRESH_LUA + """
+local key, set_at = KEYS[1], KEYS[2]
+if not fresh(redis.call('HGET', key, ARGV[3])) then
+    return {0, false}
+end
+local presented = redis.call('HGET', key, ARGV[4])
+if ARGV[5] == '1' then
+    redis.call('HDEL', key, ARGV[3])
+    redis.call('ZREM', set_at, ARGV[3])
+end
+redis.call('HDEL', key, ARGV[4])
+redis.call('ZREM', set_at, ARGV[4])
+if fresh(presented) then
+    return {1, string.match(presented, '^%d+ (.*)$')}
+end
+return {1, false}
+"""
+
+_scripts = {}
+
+
+def _script(lua):
+    if lua not in _scripts:
+        _scripts[lua] = sentinel.master.register_script(lua)
+    return _scripts[lua]
+
+
+def _set(usr, field, value, nx=False):
+    return bool(_script(SET_LUA)(
+        keys=[TASKS_KEY % usr, SET_AT_KEY % usr],
+        args=[int(time.time()), TIMEOUT, field, value, int(nx),
+              PRUNE_BATCH]))
+
+
+def mark_requested(usr, task_id):
+    """Record that task_id was given to usr."""
+    _set(usr, 'requested:%s' % task_id, 1)
+
+
+def mark_presented(usr, task_id, presented_time, force=False):
+    """Record the time task_id was presented to usr, unless it already was
+    and force is False. Return whether it was recorded."""
+    return _set(usr, 'presented:%s' % task_id, presented_time, nx=not force)
+
+
+def consume(usr, task_id, consume_request=True):
+    """Return (requested, presented_time) for a submission of task_id by
+    usr: whether the task was given to usr, and the time it was presented
+    to it or None.
+
+    If the task was given to usr, its presented time is deleted, and so is
+    the request if consume_request, in the same atomic step."""
+    requested, presented_time = _script(CONSUME_LUA)(
+        keys=[TASKS_KEY % usr, SET_AT_KEY % usr],
+        args=[int(time.time()), TIMEOUT, 'requested:%s' % task_id,
+              'presented:%s' % task_id, int(consume_request)])
+    return bool(requested), presented_time
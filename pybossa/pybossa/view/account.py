@@ -559,6 +559,7 @@ def _handle_profile_update(user, update_form):
         user.subscribed = update_form.subscribed.data
         user_repo.update(user)
         cached_users.delete_user_summary(user.name)
+        cached_users.delete_api_key(user.api_key)
         flash(gettext('Your profile has been updated!'), 'success')
     else:
         flash(gettext('Please correct the errors'), 'error')
@@ -702,9 +703,11 @@ def reset_api_key(name):
     if not user:
         return abort(404)
     ensure_authorized_to('update', user)
+    old_api_key = user.api_key
     user.api_key = model.make_uuid()
     user_repo.update(user)
     cached_users.delete_user_summary(user.name)
+    cached_users.delete_api_key(old_api_key)
     msg = gettext('New API-KEY generated')
     flash(msg, 'success')
     return redirect(url_for('account.profile', name=name))
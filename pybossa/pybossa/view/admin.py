@@ -38,6 +38,7 @@ from pybossa.model.category import Category
 from pybossa.util import admin_required, UnicodeWriter
 from pybossa.cache import projects as cached_projects
 from pybossa.cache import categories as cached_cat
+from pybossa.cache import users as cached_users
 from pybossa.auth import ensure_authorized_to
 from pybossa.core import project_repo, user_repo, sentinel
 from pybossa.feed import get_update_feed
@@ -221,6 +222,7 @@ def add_admin(user_id=None):
                 ensure_authorized_to('update', user)
                 user.admin = True
                 user_repo.update(user)
+                cached_users.delete_api_key(user.api_key)
                 return redirect(url_for(".users"))
             else:
                 msg = "User not found"
@@ -242,6 +244,7 @@ def del_admin(user_id=None):
                 ensure_authorized_to('update', user)
                 user.admin = False
                 user_repo.update(user)
+                cached_users.delete_api_key(user.api_key)
                 return redirect(url_for('.users'))
             else:
                 msg = "User.id not found"
@@ -486,6 +489,7 @@ def add_subadmin(user_id=None):
                 ensure_authorized_to('update', user)
                 user.subadmin = True
                 user_repo.update(user)
+                cached_users.delete_api_key(user.api_key)
                 return redirect(url_for(".subadminusers"))
             else:
                 msg = "User not found"
@@ -507,6 +511,7 @@ def del_subadmin(user_id=None):
                 ensure_authorized_to('update', user)
                 user.subadmin = False
                 user_repo.update(user)
+                cached_users.delete_api_key(user.api_key)
                 return redirect(url_for('.subadminusers'))
             else:
                 msg = "User.id not found"
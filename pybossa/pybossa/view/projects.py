@@ -39,23 +39,24 @@ from pybossa.model.task import Task
 from pybossa.model.task_run import TaskRun
 from pybossa.model.auditlog import Auditlog
 from pybossa.model.blogpost import Blogpost
-from pybossa.util import Pagination, admin_required, get_user_id_or_ip, rank, admin_or_subadmin_required
+from pybossa.util import Pagination, admin_required, get_user_id_or_ip, admin_or_subadmin_required
 from pybossa.auth import ensure_authorized_to
 from pybossa.cache import projects as cached_projects
 from pybossa.cache import categories as cached_cat
 from pybossa.cache import project_stats as stats
-from pybossa.cache.helpers import add_custom_contrib_button_to
 from pybossa.ckan import Ckan
 from pybossa.extensions import misaka
 from pybossa.cookies import CookieHandler
 from pybossa.password_manager import ProjectPasswdManager
-from pybossa.jobs import import_tasks
+from pybossa.jobs import import_tasks, IMPORT_JOB_TIMEOUT
 from pybossa.forms.projects_view_forms import *
 from pybossa.importers import BulkImportException
+import pybossa.import_progress as import_progress
 
 from pybossa.core import project_repo, user_repo, task_repo, blog_repo, auditlog_repo
 from pybossa.auditlogger import AuditLogger
 from pybossa.api import mark_task_as_requested_by_user
+from pybossa.feed import get_project_feed
 
 blueprint = Blueprint('project', __name__)
 
@@ -116,7 +117,7 @@ def redirect_old_draft(page):
 def index(page):
     """List projects in the system"""
     if cached_projects.n_count('featured') > 0:
-        return project_index(page, cached_projects.get_all_featured, 'featured',
+        return project_index(page, cached_projects.get_featured, 'featured',
                          True, False)
     else:
         categories = cached_cat.get_all()
@@ -129,9 +130,7 @@ def project_index(page, lookup, category, fallback, use_count):
 
     per_page = current_app.config['APPS_PER_PAGE']
 
-    ranked_projects = rank(lookup(category))
-    offset = (page - 1) * per_page
-    projects = ranked_projects[offset:offset+per_page]
+    projects = lookup(category, page, per_page)
 
     count = cached_projects.n_count(category)
 
@@ -175,7 +174,7 @@ def project_index(page, lookup, category, fallback, use_count):
 @login_required
 def draft(page):
     """Show the Draft projects"""
-    return project_index(page, cached_projects.get_all_draft, 'draft',
+    return project_index(page, cached_projects.get_draft, 'draft',
                      False, True)
 
 
@@ -184,7 +183,7 @@ def draft(page):
 @login_required
 def project_cat_index(category, page):
     """Show Projects that belong to a given category"""
-    return project_index(page, cached_projects.get_all, category, False, True)
+    return project_index(page, cached_projects.get, category, False, True)
 
 
 @blueprint.route('/new', methods=['GET', 'POST'])
@@ -295,7 +294,7 @@ def task_presenter_editor(short_name):
             wrap = lambda i: "projects/presenters/%s.html" % i
             pres_tmpls = map(wrap, current_app.config.get('PRESENTERS'))
 
-            project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+            project = project.dictize()
             return render_template(
                 'projects/task_presenter_options.html',
                 title=title,
@@ -317,7 +316,7 @@ def task_presenter_editor(short_name):
                       the <strong>preview section</strong>. Click in the \
                       preview button!'
         flash(gettext(msg), 'info')
-    dict_project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    dict_project = project.dictize()
     return render_template('projects/task_presenter_editor.html',
                            title=title,
                            form=form,
@@ -440,7 +439,7 @@ def update(short_name):
                       'error')
             return redirect(url_for('.update', short_name=short_name))
 
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
     return render_template('/projects/update.html',
                            form=form,
                            upload_form=upload_form,
@@ -469,7 +468,7 @@ def details(short_name):
         return redirect_to_password
 
     title = project_title(project, None)
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
     template_args = {"project": project, "title": title,
                      "owner": owner,
                      "n_tasks": n_tasks,
@@ -477,7 +476,8 @@ def details(short_name):
                      "overall_progress": overall_progress,
                      "last_activity": last_activity,
                      "n_completed_tasks": cached_projects.n_completed_tasks(project.get('id')),
-                     "n_volunteers": cached_projects.n_volunteers(project.get('id'))}
+                     "n_volunteers": cached_projects.n_volunteers(project.get('id')),
+                     "update_feed": get_project_feed(project.get('id'))}
     if current_app.config.get('CKAN_URL'):
         template_args['ckan_name'] = current_app.config.get('CKAN_NAME')
         template_args['ckan_url'] = current_app.config.get('CKAN_URL')
@@ -494,7 +494,7 @@ def settings(short_name):
     title = project_title(project, "Settings")
     ensure_authorized_to('read', project)
     ensure_authorized_to('update', project)
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
     return render_template('/projects/settings.html',
                            project=project,
                            owner=owner,
@@ -516,7 +516,7 @@ def import_task(short_name):
     n_completed_tasks = cached_projects.n_completed_tasks(project.id)
     title = project_title(project, "Import Tasks")
     loading_text = gettext("Importing tasks, this may take a while, wait...")
-    dict_project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    dict_project = project.dictize()
     template_args = dict(title=title, loading_text=loading_text,
                          project=dict_project,
                          owner=owner,
@@ -567,17 +567,55 @@ def import_task(short_name):
 
 
 def _import_tasks(project, **form_data):
-    number_of_tasks = importer.count_tasks_to_import(**form_data)
+    number_of_tasks = importer.count_tasks_to_import(
+        limit=MAX_NUM_SYNCHRONOUS_TASKS_IMPORT + 1, **form_data)
     if number_of_tasks <= MAX_NUM_SYNCHRONOUS_TASKS_IMPORT:
         msg = importer.create_tasks(task_repo, project.id, **form_data)
         flash(msg)
     else:
-        importer_queue.enqueue(import_tasks, project.id, **form_data)
+        import_progress.start_import(project.id, form_data)
+        importer_queue.enqueue_call(func=import_tasks, args=[project.id],
+                                    kwargs=form_data,
+                                    timeout=IMPORT_JOB_TIMEOUT)
         flash(gettext("You're trying to import a large amount of tasks, so please be patient.\
             You will receive an email when the tasks are ready."))
     return redirect(url_for('.tasks', short_name=project.short_name))
 
 
+@blueprint.route('/<short_name>/tasks/import/progress')
+@login_required
+def import_task_progress(short_name):
+    """Return the progress of the background import of a project."""
+    project = project_repo.get_by_shortname(short_name)
+    if project is None:
+        return abort(404)
+    ensure_authorized_to('update', project)
+    current = import_progress.get_import(project.id)
+    if current is None:
+        return abort(404)
+    current.pop('form_data')
+    return Response(json.dumps(current), mimetype='application/json')
+
+
+@blueprint.route('/<short_name>/tasks/import/resume', methods=['POST'])
+@login_required
+def resume_import_task(short_name):
+    """Resume a failed background import from its last checkpoint."""
+    project = project_repo.get_by_shortname(short_name)
+    if project is None:
+        return abort(404)
+    ensure_authorized_to('update', project)
+    current = import_progress.get_import(project.id)
+    if current is None or current['status'] != import_progress.FAILED:
+        return abort(404)
+    import_progress.update_import(project.id, import_progress.QUEUED)
+    importer_queue.enqueue_call(func=import_tasks, args=[project.id],
+                                kwargs=current['form_data'],
+                                timeout=IMPORT_JOB_TIMEOUT)
+    flash(gettext("The import will resume from where it stopped."))
+    return redirect(url_for('.tasks', short_name=project.short_name))
+
+
 @blueprint.route('/<short_name>/tasks/autoimporter', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -588,7 +626,7 @@ def setup_autoimporter(short_name):
      overall_progress, last_activity) = project_by_shortname(short_name)
     n_volunteers = cached_projects.n_volunteers(project.id)
     n_completed_tasks = cached_projects.n_completed_tasks(project.id)
-    dict_project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    dict_project = project.dictize()
     template_args = dict(project=dict_project,
                          owner=owner,
                          n_tasks=n_tasks,
@@ -642,7 +680,7 @@ def delete_autoimporter(short_name):
      overall_progress, last_activity) = project_by_shortname(short_name)
     n_volunteers = cached_projects.n_volunteers(project.id)
     n_completed_tasks = cached_projects.n_completed_tasks(project.id)
-    dict_project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    dict_project = project.dictize()
     template_args = dict(project=dict_project,
                          owner=owner,
                          n_tasks=n_tasks,
@@ -720,7 +758,7 @@ def task_presenter(short_name, task_id):
 
     if not (task.project_id == project.id):
         return respond('/projects/task/wrong.html')
-    mark_task_as_requested_by_user(task, sentinel.master)
+    mark_task_as_requested_by_user(task)
     return respond('/projects/presenter.html')
 
 
@@ -822,7 +860,7 @@ def tasks(short_name):
     redirect_to_password = _check_if_redirect_to_password(project)
     if redirect_to_password:
         return redirect_to_password
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
 
     return render_template('/projects/tasks.html',
                            title=title,
@@ -870,7 +908,7 @@ def tasks_browse(short_name, page):
     redirect_to_password = _check_if_redirect_to_password(project)
     if redirect_to_password:
         return redirect_to_password
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
     return respond()
 
 
@@ -886,7 +924,7 @@ def delete_tasks(short_name):
         title = project_title(project, "Delete")
         n_volunteers = cached_projects.n_volunteers(project.id)
         n_completed_tasks = cached_projects.n_completed_tasks(project.id)
-        project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+        project = project.dictize()
         return render_template('projects/tasks/delete.html',
                                project=project,
                                owner=owner,
@@ -955,7 +993,7 @@ def export_to(short_name):
         for k in tmp:
             k = "%s__%s" % (ty, k)
             task_keys.append(k)
-        if (type(row['info']) == dict):
+        if (isinstance(row['info'], dict)):
             task_info_keys = []
             tmp = row['info'].keys()
             for k in tmp:
@@ -1102,7 +1140,7 @@ def export_to(short_name):
     if not (fmt and ty):
         if len(request.args) >= 1:
             abort(404)
-        project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+        project = project.dictize()
         return render_template('/projects/export.html',
                                title=title,
                                loading_text=loading_text,
@@ -1135,7 +1173,7 @@ def show_stats(short_name):
         return redirect_to_password
 
     if not ((n_tasks > 0) and (n_task_runs > 0)):
-        project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+        project = project.dictize()
         return render_template('/projects/non_stats.html',
                                title=title,
                                project=project,
@@ -1169,7 +1207,7 @@ def show_stats(short_name):
                dayStats=dates_stats,
                hourStats=hours_stats)
 
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
     return render_template('/projects/stats.html',
                            title=title,
                            appStats=json.dumps(tmp),
@@ -1192,7 +1230,7 @@ def task_settings(short_name):
     n_completed_tasks = cached_projects.n_completed_tasks(project.id)
     ensure_authorized_to('read', project)
     ensure_authorized_to('update', project)
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
     return render_template('projects/task_settings.html',
                            project=project,
                            owner=owner,
@@ -1336,7 +1374,7 @@ def show_blogposts(short_name):
     redirect_to_password = _check_if_redirect_to_password(project)
     if redirect_to_password:
         return redirect_to_password
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
     return render_template('projects/blog.html', project=project,
                            owner=owner, blogposts=blogposts,
                            overall_progress=overall_progress,
@@ -1357,7 +1395,7 @@ def show_blogpost(short_name, id):
     redirect_to_password = _check_if_redirect_to_password(project)
     if redirect_to_password:
         return redirect_to_password
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
     return render_template('projects/blog_post.html',
                            project=project,
                            owner=owner,
@@ -1374,7 +1412,7 @@ def show_blogpost(short_name, id):
 def new_blogpost(short_name):
 
     def respond():
-        dict_project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+        dict_project = project.dictize()
         return render_template('projects/new_blogpost.html',
                                title=gettext("Write a new post"),
                                form=form,
@@ -1495,7 +1533,7 @@ def auditlog(short_name):
     redirect_to_password = _check_if_redirect_to_password(project)
     if redirect_to_password:
         return redirect_to_password
-    project = add_custom_contrib_button_to(project, get_user_id_or_ip())
+    project = project.dictize()
     return render_template('projects/auditlog.html', project=project,
                            owner=owner, logs=logs,
                            overall_progress=overall_progress,
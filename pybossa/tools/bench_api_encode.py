@@ -0,0 +1,69 @@
+# -*- coding: utf8 -*-
+"""Compare encoding an API list page as the API did before streaming, with
+json.dumps of the whole list, with the streamed encoder of APIBase that
+passes stored info through as raw JSON.
+
+Runs offline on synthetic task runs:
+
+    python tools/bench_api_encode.py [n_items]
+
+Each case is timed from the stored JSON text of info, decoded by JSONType as
+it was before RawJSONDict (loaded from git, see bench_harness) or as it is,
+so the decoding done when the rows are loaded is part of both paths.
+"""
+import json
+import sys
+
+from pybossa.api.api_base import APIBase
+from pybossa.model import JSONType
+
+from bench_harness import baseline, best_of, report
+
+
+class Encoder(APIBase):
+
+    """APIBase encoding rows that are already dicts."""
+
+    def _create_dict_from_model(self, item):
+        return item
+
+
+def old_path(decode, rows):
+    return json.dumps([dict(row, info=decode(row['info'])) for row in rows])
+
+
+def new_path(decode, rows):
+    encoder = Encoder()
+    items = [dict(row, info=decode(row['info'])) for row in rows]
+    first = encoder._encode(items[0])
+    return ''.join(encoder._encode_list(first, items[1:]))
+
+
+def task_runs(n_items, info_bytes):
+    answer = 'x' * info_bytes
+    info = json.dumps({'answer': answer, 'tags': ['a', 'b'], 'score': 0.5})
+    return [{'id': i, 'project_id': 1, 'task_id': i, 'user_id': i % 50,
+             'user_ip': None, 'created': '2016-01-01T00:00:00',
+             'finish_time': '2016-01-01T00:01:00', 'calibration': None,
+             'external_uid': None, 'media_url': None, 'timeout': None,
+             'links': ['<link rel="parent" href="/api/task/%s"/>' % i],
+             'info': info}
+            for i in range(n_items)]
+
+
+if __name__ == '__main__':
+    n_items = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    model = baseline('pybossa/model/__init__.py', 'class RawJSONDict')
+    old_type, new_type = model.JSONType(), JSONType()
+    old_decode = lambda value: old_type.process_result_value(value, None)
+    new_decode = lambda value: new_type.process_result_value(value, None)
+    print 'old: JSONType of %s and json.dumps of the list' % model.baseline_rev
+    for info_bytes in (100, 1000, 20000):
+        rows = task_runs(n_items, info_bytes)
+        assert (json.loads(old_path(old_decode, rows)) ==
+                json.loads(new_path(new_decode, rows)))
+        print '%d items, %d byte info:' % (n_items, info_bytes)
+        report('old', best_of(lambda: old_path(old_decode, rows),
+                              number=20, repeat=3))
+        report('new', best_of(lambda: new_path(new_decode, rows),
+                              number=20, repeat=3))
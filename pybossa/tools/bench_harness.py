@@ -0,0 +1,58 @@
+# -*- coding: utf8 -*-
+"""Helpers shared by the benchmarks in this directory.
+
+The code a benchmark compares against is not copied into it, but loaded
+from git: baseline(path, marker) loads the module at path as it was before
+the last commit that added or removed marker in it, which is the change
+being measured. Set BENCH_BASELINE to a revision to load every baseline
+from that revision instead:
+
+    BENCH_BASELINE=v1.2.0 python tools/bench_project_rank.py
+
+Run the benchmarks from the pybossa directory, in a git checkout.
+"""
+import imp
+import os
+import subprocess
+import timeit
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _git(*args):
+    return subprocess.check_output(('git',) + args, cwd=ROOT)
+
+
+def baseline_rev(path, marker):
+    """Return the revision the baseline of path is loaded from."""
+    rev = os.environ.get('BENCH_BASELINE')
+    if rev:
+        return rev
+    commit = _git('log', '-1', '--format=%H', '-S' + marker, '--',
+                  path).strip()
+    if not commit:
+        raise ValueError('no commit of %s changes %r' % (path, marker))
+    return commit + '^'
+
+
+def baseline(path, marker):
+    """Return the module at path, relative to the pybossa directory, as it
+    was in its baseline revision. Its imports are resolved against the
+    current tree."""
+    rev = baseline_rev(path, marker)
+    source = _git('show', '%s:./%s' % (rev, path))
+    module = imp.new_module('baseline.%s' % path[:-3].replace('/', '.'))
+    module.__file__ = os.path.join(ROOT, path)
+    exec compile(source, '%s (%s)' % (path, rev), 'exec') in module.__dict__
+    module.baseline_rev = rev
+    return module
+
+
+def best_of(func, number=1, repeat=5):
+    """Return the best time of func over repeat runs, in seconds per call."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def report(label, seconds):
+    print '  %-44s %9.2f ms' % (label, seconds * 1000)
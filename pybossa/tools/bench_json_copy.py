@@ -0,0 +1,84 @@
+# -*- coding: utf8 -*-
+"""Check whether SQLAlchemy snapshots JSONType and JSONEncodedDict values
+with copy_value when rows are loaded, and what a snapshot costs.
+
+Runs offline against an in-memory SQLite database:
+
+    python tools/bench_json_copy.py [n_rows]
+"""
+import json
+import sys
+
+import sqlalchemy
+from sqlalchemy import Column, Integer, create_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+from pybossa.model import JSONType, JSONEncodedDict
+
+from bench_harness import best_of, report
+
+
+calls = {}
+
+
+def count_copy_value(cls):
+    copy_value = cls.copy_value
+
+    def counted(self, value):
+        calls[cls.__name__] = calls.get(cls.__name__, 0) + 1
+        return copy_value(self, value)
+    cls.copy_value = counted
+
+
+def info_of_size(n_keys):
+    return dict(('key_%s' % i, {'url': 'http://example.com/%s.jpg' % i,
+                                'width': i, 'tags': ['a', 'b', 'c']})
+                for i in range(n_keys))
+
+
+def count_calls_on_load(n_rows):
+    Base = declarative_base()
+
+    class Row(Base):
+        __tablename__ = 'row'
+        id = Column(Integer, primary_key=True)
+        task_info = Column(JSONType, default=dict)
+        project_info = Column(JSONEncodedDict, default=dict)
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    info = info_of_size(10)
+    session.add_all([Row(task_info=info, project_info=info)
+                     for _ in range(n_rows)])
+    session.commit()
+    session.close()
+
+    count_copy_value(JSONType)
+    count_copy_value(JSONEncodedDict)
+    session = Session()
+    rows = session.query(Row).all()
+    print 'copy_value calls loading %d rows: %r' % (len(rows), calls)
+    calls.clear()
+    rows[0].project_info['changed'] = True
+    session.commit()
+    print 'copy_value calls flushing a change: %r' % calls
+
+
+def time_copies():
+    print 'JSONType.copy_value:'
+    copy_value = JSONType().copy_value
+    for n_keys in (1, 10, 100):
+        info = info_of_size(n_keys)
+        size = len(json.dumps(info))
+        report('%d bytes' % size, best_of(lambda: copy_value(info),
+                                          number=1000, repeat=3))
+
+
+if __name__ == '__main__':
+    print 'SQLAlchemy %s' % sqlalchemy.__version__
+    # timed before count_calls_on_load wraps copy_value
+    time_copies()
+    count_calls_on_load(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
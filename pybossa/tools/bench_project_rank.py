@@ -0,0 +1,75 @@
+# -*- coding: utf8 -*-
+"""Compare ranking projects in Python, as util.rank did, with reading a
+ranked page ordered by project.rank_score.
+
+util.rank is loaded from git, as it was before rank_score (see
+bench_harness). The Python part runs offline on synthetic projects:
+
+    python tools/bench_project_rank.py [n_projects]
+
+Given a database URL, it also times, on that database, a ranked page read
+through project_published_rank_idx and the UPDATE of the ranking job (in a
+transaction that is rolled back):
+
+    python tools/bench_project_rank.py 10000 postgresql://user:pw@host/db
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from bench_harness import baseline, best_of, report
+
+
+def synthetic_projects(n):
+    now = datetime.utcnow()
+    projects = []
+    for i in range(n):
+        updated = now - timedelta(seconds=random.randint(0, 30 * 86400))
+        activity = now - timedelta(seconds=random.randint(0, 30 * 86400))
+        projects.append(dict(
+            id=i, name=u'Project %s' % i, short_name=u'project%s' % i,
+            info={'thumbnail': 'thumb.png'} if i % 3 else {},
+            overall_progress=random.choice([0, 50, 100]),
+            n_tasks=random.randint(0, 500),
+            n_volunteers=random.randint(0, 200),
+            updated=updated.isoformat(),
+            last_activity_raw=activity.isoformat()))
+    return projects
+
+
+def bench_python(n, repeat=5):
+    util = baseline('pybossa/util.py', 'def rank(')
+    projects = synthetic_projects(n)
+    print 'util.rank (%s), %d projects:' % (util.baseline_rev, n)
+    report('listing', best_of(lambda: util.rank(list(projects)),
+                              repeat=repeat))
+
+
+def bench_database(url, repeat=5):
+    from sqlalchemy import create_engine, text
+    from pybossa.ranking import RANK_SCORE_SQL
+    engine = create_engine(url)
+    page = text('''SELECT id, name, short_name FROM project
+                WHERE category_id=:category AND hidden=0 AND has_presenter
+                AND n_tasks > 0
+                ORDER BY rank_score DESC, name LIMIT 20''')
+    with engine.connect() as conn:
+        category = conn.execute(text('''SELECT category_id FROM project
+                                     GROUP BY category_id
+                                     ORDER BY COUNT(*) DESC LIMIT 1''')).scalar()
+        n = conn.execute(text('SELECT COUNT(*) FROM project')).scalar()
+        print 'rank_score, %d projects:' % n
+        report('page read', best_of(
+            lambda: conn.execute(page, category=category).fetchall(),
+            repeat=repeat))
+        trans = conn.begin()
+        report('ranking job UPDATE (rolled back)',
+               best_of(lambda: conn.execute(text(RANK_SCORE_SQL)), repeat=1))
+        trans.rollback()
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    bench_python(n)
+    if len(sys.argv) > 2:
+        bench_database(sys.argv[2])
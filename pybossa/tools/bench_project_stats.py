@@ -0,0 +1,86 @@
+# -*- coding: utf8 -*-
+"""Compare the project stats the stats page reads, as computed before the
+rollups (loaded from git, see bench_harness), from the task runs until the
+rollups are filled, and from the project_stats_day and project_stats_hour
+rollups.
+
+It runs against the database of the configured settings, with the rollups
+refreshed (refresh_stats_rollups job):
+
+    python tools/bench_project_stats.py [project_id]
+
+Without a project_id, the project with the most task runs is used.
+"""
+import os
+import sys
+
+from sqlalchemy import text
+
+from bench_harness import baseline, best_of, report
+
+
+STATS = ('stats_users', 'stats_dates', 'stats_hours')
+
+
+def time_stats(label, module, project_id, new_page=lambda: None):
+    print '%s:' % label
+    for name in STATS:
+        stat = getattr(module, name)
+        report(name, best_of(lambda: (new_page(), stat(project_id)),
+                             repeat=3))
+
+    def page():
+        new_page()
+        for name in STATS:
+            getattr(module, name)(project_id)
+    report('page', best_of(page, repeat=3))
+
+
+def cached_per_page(module, name):
+    """Cache the results of a function the stats share, as memoize did, for
+    one page. Return the function that starts a new page."""
+    func = getattr(module, name)
+    results = {}
+
+    def cached(*args):
+        if args not in results:
+            results[args] = func(*args)
+        return results[args]
+    setattr(module, name, cached)
+    return results.clear
+
+
+def main(project_id=None):
+    # memoize calls through to the functions
+    os.environ['PYBOSSA_REDIS_CACHE_DISABLED'] = '1'
+    from pybossa.core import create_app, db
+    app = create_app(run_as_server=False)
+    with app.app_context():
+        from pybossa import stats_rollups
+        from pybossa.cache import project_stats
+        old = baseline('pybossa/cache/project_stats.py', 'GROUPING SETS')
+        session = db.slave_session
+        if project_id is None:
+            project_id = session.execute(text(
+                '''SELECT project_id FROM task_run GROUP BY project_id
+                ORDER BY COUNT(*) DESC LIMIT 1''')).scalar()
+        n = session.execute(text('''SELECT COUNT(*) FROM task_run
+                                 WHERE project_id=:project_id'''),
+                            dict(project_id=project_id)).scalar()
+        print 'project %s, %d task runs' % (project_id, n)
+        time_stats('before the rollups (%s)' % old.baseline_rev, old,
+                   project_id, cached_per_page(old, 'stats_aggregates'))
+        if not stats_rollups.ready(session):
+            sys.exit('the rollups are not refreshed yet')
+        time_stats('rollup reads', project_stats, project_id)
+        ready = stats_rollups.ready
+        stats_rollups.ready = lambda session=None: False
+        try:
+            time_stats('task runs, until the rollups are filled',
+                       project_stats, project_id)
+        finally:
+            stats_rollups.ready = ready
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,79 @@
+# -*- coding: utf8 -*-
+"""Check the retries of the bulk importers against a local stub server.
+
+Runs offline: the server listens on 127.0.0.1 and fails the way remote
+sources do. Run it from the pybossa directory:
+
+    python tools/importer_retries.py
+"""
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from flask import Flask
+from pybossa.importers import _BulkTaskCSVImport, BulkImportException
+
+
+CSV = 'question,answer\nOne?,1\nTwo?,2\n'
+hits = {}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        hits[self.path] = hits.get(self.path, 0) + 1
+        if self.path == '/flaky' and hits[self.path] <= 2:
+            return self._reply(503, 'text/plain', 'try again')
+        if self.path == '/down':
+            return self._reply(503, 'text/plain', 'down')
+        if self.path == '/forbidden':
+            return self._reply(403, 'text/plain', 'forbidden')
+        if self.path == '/html':
+            return self._reply(200, 'text/html', '<html></html>')
+        return self._reply(200, 'text/csv', CSV)
+
+    def _reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def import_csv(url):
+    start = time.time()
+    try:
+        result = list(_BulkTaskCSVImport().tasks(csv_url=url))
+    except BulkImportException as e:
+        result = 'BulkImportException: %s' % e.args[0]
+    return result, time.time() - start
+
+
+def main():
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    base = 'http://127.0.0.1:%s' % server.server_port
+    with Flask(__name__).test_request_context():
+        for path, expected in [('/ok', list), ('/flaky', list),
+                               ('/down', unicode), ('/forbidden', unicode),
+                               ('/html', unicode)]:
+            result, elapsed = import_csv(base + path)
+            print '%-10s %d hits %.1fs %r' % (path, hits.get(path, 0),
+                                              elapsed, result)
+            if expected is list:
+                assert isinstance(result, list) and len(result) == 2
+            else:
+                assert isinstance(result, basestring)
+    assert hits['/flaky'] == 3, 'two failures and a retry that succeeds'
+    assert hits['/down'] == 4, 'the request and its three retries'
+    server.shutdown()
+    print 'OK'
+
+
+if __name__ == '__main__':
+    main()